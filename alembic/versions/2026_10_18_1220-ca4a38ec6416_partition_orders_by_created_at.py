@@ -0,0 +1,165 @@
+"""partition orders by created_at
+
+Revision ID: ca4a38ec6416
+Revises: 8f2ad6231092
+Create Date: 2026-10-18 12:20:53.318405
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ca4a38ec6416'
+down_revision: Union[str, None] = '8f2ad6231092'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# creates the missing monthly partitions of both tables covering
+# [from_date, to_date]; returns how many months were added
+CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_order_partitions(from_date date, to_date date)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start date := date_trunc('month', from_date)::date;
+    month_end date;
+    suffix text;
+    created integer := 0;
+BEGIN
+    WHILE month_start <= to_date LOOP
+        month_end := (month_start + interval '1 month')::date;
+        suffix := to_char(month_start, 'YYYY_MM');
+        IF to_regclass('orders_p' || suffix) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF orders FOR VALUES FROM (%L) TO (%L)',
+                'orders_p' || suffix, month_start, month_end
+            );
+            created := created + 1;
+        END IF;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF order_product_association FOR VALUES FROM (%L) TO (%L)',
+            'order_product_association_p' || suffix, month_start, month_end
+        );
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    # move the plain tables aside; index-backed constraint names are
+    # schema-wide, so free the ones the partitioned tables reuse
+    op.rename_table('order_product_association', 'order_product_association_old')
+    op.execute("ALTER INDEX order_product_association_pkey RENAME TO order_product_association_old_pkey")
+    op.drop_constraint('idx_unique_order_product', 'order_product_association_old', type_='unique')
+    op.rename_table('orders', 'orders_old')
+    op.execute("ALTER INDEX orders_pkey RENAME TO orders_old_pkey")
+    op.drop_index('ix_orders_created_at_id', table_name='orders_old')
+
+    op.create_table('orders',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('orders_id_seq')"), nullable=False),
+    sa.Column('promocode', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('items_count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+    op.create_table('order_product_association',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('order_product_association_id_seq')"), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('order_created_at', sa.DateTime(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='1', nullable=False),
+    sa.ForeignKeyConstraint(['order_id', 'order_created_at'], ['orders.id', 'orders.created_at'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id', 'order_created_at'),
+    sa.UniqueConstraint('order_id', 'product_id', 'order_created_at', name='idx_unique_order_product'),
+    postgresql_partition_by='RANGE (order_created_at)'
+    )
+    # keep the id sequences alive when the old tables are dropped
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+    op.execute("ALTER SEQUENCE order_product_association_id_seq OWNED BY order_product_association.id")
+
+    op.execute(CREATE_PARTITIONS_FUNCTION)
+    op.execute("CREATE TABLE orders_default PARTITION OF orders DEFAULT")
+    op.execute("CREATE TABLE order_product_association_default PARTITION OF order_product_association DEFAULT")
+    op.execute(
+        """
+        SELECT create_order_partitions(
+            coalesce((SELECT min(created_at) FROM orders_old), now())::date,
+            (now() + interval '3 months')::date
+        )
+        """
+    )
+
+    op.execute(
+        """
+        INSERT INTO orders (id, promocode, created_at, total, items_count)
+        SELECT id, promocode, created_at, total, items_count FROM orders_old
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO order_product_association (id, order_id, order_created_at, product_id, count)
+        SELECT opa.id, opa.order_id, orders_old.created_at, opa.product_id, opa.count
+        FROM order_product_association_old AS opa
+        JOIN orders_old ON orders_old.id = opa.order_id
+        """
+    )
+    op.drop_table('order_product_association_old')
+    op.drop_table('orders_old')
+
+
+def downgrade() -> None:
+    op.rename_table('order_product_association', 'order_product_association_part')
+    op.execute("ALTER INDEX order_product_association_pkey RENAME TO order_product_association_part_pkey")
+    op.drop_constraint('idx_unique_order_product', 'order_product_association_part', type_='unique')
+    op.rename_table('orders', 'orders_part')
+    op.execute("ALTER INDEX orders_pkey RENAME TO orders_part_pkey")
+    op.drop_index('ix_orders_created_at_id', table_name='orders_part')
+
+    op.create_table('orders',
+    sa.Column('promocode', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('orders_id_seq')"), nullable=False),
+    sa.Column('total', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('items_count', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+    op.create_table('order_product_association',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('order_product_association_id_seq')"), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='1', nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('order_id', 'product_id', name='idx_unique_order_product')
+    )
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+    op.execute("ALTER SEQUENCE order_product_association_id_seq OWNED BY order_product_association.id")
+
+    op.execute(
+        """
+        INSERT INTO orders (id, promocode, created_at, total, items_count)
+        SELECT id, promocode, created_at, total, items_count FROM orders_part
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO order_product_association (id, order_id, product_id, count)
+        SELECT id, order_id, product_id, count FROM order_product_association_part
+        """
+    )
+    # dropping the parents drops their partitions
+    op.drop_table('order_product_association_part')
+    op.drop_table('orders_part')
+    op.execute("DROP FUNCTION create_order_partitions(date, date)")
@@ -0,0 +1,43 @@
+"""default orders created_at to utc
+
+Revision ID: 0f7f996e205e
+Revises: 4e9a6e1b895c
+Create Date: 2026-10-18 13:50:41.902215
+
+now() in a timestamp without time zone column is the server's local time,
+while the rollup, archive and related-products cutoffs are UTC. Existing
+rows are left as they are: they are already UTC on servers running with
+TimeZone = 'UTC' (the default of the official images).
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0f7f996e205e'
+down_revision: Union[str, None] = '4e9a6e1b895c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'orders',
+        'created_at',
+        server_default=sa.text("timezone('utc', now())"),
+        existing_type=sa.DateTime(),
+        existing_nullable=False,
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'orders',
+        'created_at',
+        server_default=sa.text('now()'),
+        existing_type=sa.DateTime(),
+        existing_nullable=False,
+    )
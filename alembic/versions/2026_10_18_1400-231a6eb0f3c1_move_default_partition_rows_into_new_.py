@@ -0,0 +1,120 @@
+"""move default partition rows into new order partitions
+
+Revision ID: 231a6eb0f3c1
+Revises: 0f7f996e205e
+Create Date: 2026-10-18 14:00:12.604877
+
+Creating a monthly partition fails once the default partition holds rows
+of that month (orders created while the partition was missing). The
+function now moves those rows into the new partition first: it is created
+as a plain table, filled from the default partition and then attached.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '231a6eb0f3c1'
+down_revision: Union[str, None] = '0f7f996e205e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# creates the missing monthly partitions of both tables covering
+# [from_date, to_date]; returns how many months were added. Lines leave the
+# default partition before their orders and are attached after them, so
+# the foreign key holds at every step.
+CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_order_partitions(from_date date, to_date date)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start date := date_trunc('month', from_date)::date;
+    month_end date;
+    orders_partition text;
+    lines_partition text;
+    new_orders boolean;
+    new_lines boolean;
+    created integer := 0;
+BEGIN
+    WHILE month_start <= to_date LOOP
+        month_end := (month_start + interval '1 month')::date;
+        orders_partition := 'orders_p' || to_char(month_start, 'YYYY_MM');
+        lines_partition := 'order_product_association_p' || to_char(month_start, 'YYYY_MM');
+        new_orders := to_regclass(orders_partition) IS NULL;
+        new_lines := to_regclass(lines_partition) IS NULL;
+        IF new_lines THEN
+            EXECUTE format('CREATE TABLE %I (LIKE order_product_association INCLUDING DEFAULTS)', lines_partition);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM order_product_association_default '
+                'WHERE order_created_at >= %L AND order_created_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                month_start, month_end, lines_partition
+            );
+        END IF;
+        IF new_orders THEN
+            EXECUTE format('CREATE TABLE %I (LIKE orders INCLUDING DEFAULTS)', orders_partition);
+            EXECUTE format(
+                'WITH moved AS (DELETE FROM orders_default '
+                'WHERE created_at >= %L AND created_at < %L RETURNING *) '
+                'INSERT INTO %I SELECT * FROM moved',
+                month_start, month_end, orders_partition
+            );
+            EXECUTE format(
+                'ALTER TABLE orders ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                orders_partition, month_start, month_end
+            );
+            created := created + 1;
+        END IF;
+        IF new_lines THEN
+            EXECUTE format(
+                'ALTER TABLE order_product_association ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                lines_partition, month_start, month_end
+            );
+        END IF;
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+PREVIOUS_CREATE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION create_order_partitions(from_date date, to_date date)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start date := date_trunc('month', from_date)::date;
+    month_end date;
+    suffix text;
+    created integer := 0;
+BEGIN
+    WHILE month_start <= to_date LOOP
+        month_end := (month_start + interval '1 month')::date;
+        suffix := to_char(month_start, 'YYYY_MM');
+        IF to_regclass('orders_p' || suffix) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF orders FOR VALUES FROM (%L) TO (%L)',
+                'orders_p' || suffix, month_start, month_end
+            );
+            created := created + 1;
+        END IF;
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF order_product_association FOR VALUES FROM (%L) TO (%L)',
+            'order_product_association_p' || suffix, month_start, month_end
+        );
+        month_start := month_end;
+    END LOOP;
+    RETURN created;
+END
+$$
+"""
+
+
+def upgrade() -> None:
+    op.execute(CREATE_PARTITIONS_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute(PREVIOUS_CREATE_PARTITIONS_FUNCTION)
@@ -1,10 +1,16 @@
 from fastapi import APIRouter
 from .products.view import router as products_router
+from .orders.view import router as orders_router
 from .demo_auth.views import router as demo_auth_router
 from .demo_auth.demo_jwt_auth import router as demo_jwt_auth_router
+from .internal.views import router as internal_router
+from .analytics.views import router as analytics_router
 
 demo_auth_router.include_router(demo_jwt_auth_router)
 
 router = APIRouter()
 router.include_router(router=products_router, prefix="/products")
+router.include_router(router=orders_router, prefix="/orders")
 router.include_router(router=demo_auth_router)
+router.include_router(router=internal_router)
+router.include_router(router=analytics_router)
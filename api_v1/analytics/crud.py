@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+from typing import Literal
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import CTE
+
+from core.models import DailySales, HourlySales, OrderProductAssociation, Product, RollupWatermark, utc_now
+
+from .schemas import TopProduct
+
+SALES_WATERMARK = "sales"
+# the first refresh backfills everything
+EPOCH = datetime(1970, 1, 1)
+
+
+async def lock_watermark(session: AsyncSession, name: str) -> datetime:
+    # the row lock serializes concurrent refreshes of the same rollup
+    await session.execute(
+        pg_insert(RollupWatermark)
+        .values(name=name, watermark=EPOCH)
+        .on_conflict_do_nothing(index_elements=[RollupWatermark.name])
+    )
+    stmt = select(RollupWatermark.watermark).where(RollupWatermark.name == name).with_for_update()
+    return await session.scalar(stmt)
+
+
+async def set_watermark(session: AsyncSession, name: str, watermark: datetime) -> None:
+    await session.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.name == name)
+        .values(watermark=watermark)
+    )
+
+
+async def get_watermark(session: AsyncSession, name: str) -> datetime | None:
+    return await session.scalar(select(RollupWatermark.watermark).where(RollupWatermark.name == name))
+
+
+async def refresh_sales_rollups(session: AsyncSession, lag: timedelta) -> tuple[datetime, datetime]:
+    """Bring the hourly and daily rollups up to ``lag`` before now in one transaction.
+
+    Whole buckets from the last watermark on are rebuilt (delete + insert),
+    so partial hours/days are completed by the next run and re-running is
+    harmless. Raw lines are only read for that range, through their
+    partition key; the daily rollup is derived from the hourly one.
+    The cutoff comes from the database clock, like orders.created_at.
+    Line edits on orders behind the watermark are applied by the edits
+    themselves (sales_rollup_deltas). Returns the refreshed [from, until) range.
+    """
+    watermark = await lock_watermark(session, SALES_WATERMARK)
+    until = await session.scalar(select(utc_now() - lag))
+    hour_from = watermark.replace(minute=0, second=0, microsecond=0)
+    day_from = hour_from.replace(hour=0)
+    opa = OrderProductAssociation
+
+    hour = func.date_trunc("hour", opa.order_created_at)
+    await session.execute(
+        delete(HourlySales).where(HourlySales.bucket >= hour_from, HourlySales.bucket < until)
+    )
+    await session.execute(
+        insert(HourlySales).from_select(
+            ["bucket", "product_id", "units", "revenue"],
+            select(hour, opa.product_id, func.sum(opa.count), func.sum(opa.count * Product.price))
+            .join_from(opa, Product, Product.id == opa.product_id)
+            .where(opa.order_created_at >= hour_from, opa.order_created_at < until)
+            .group_by(hour, opa.product_id),
+        )
+    )
+
+    day = func.date_trunc("day", HourlySales.bucket)
+    await session.execute(
+        delete(DailySales).where(DailySales.bucket >= day_from, DailySales.bucket < until)
+    )
+    await session.execute(
+        insert(DailySales).from_select(
+            ["bucket", "product_id", "units", "revenue"],
+            select(day, HourlySales.product_id, func.sum(HourlySales.units), func.sum(HourlySales.revenue))
+            .where(HourlySales.bucket >= day_from, HourlySales.bucket < until)
+            .group_by(day, HourlySales.product_id),
+        )
+    )
+
+    await set_watermark(session, SALES_WATERMARK, until)
+    await session.commit()
+    return hour_from, until
+
+
+def sales_rollup_deltas(changes: CTE) -> tuple[CTE, CTE]:
+    """Add line edits to the rollup buckets the refresh has already passed.
+
+    ``changes`` has one row per edited line: (created_at, product_id, units),
+    units being the change in count. Buckets from the watermark's hour
+    (day) on are left to the next refresh, which rebuilds them from the
+    lines anyway. The watermark row is share-locked so that a concurrent
+    refresh either sees the edit or has moved the watermark before the
+    edit reads it. Attach the result with add_cte() to the edit statement.
+    """
+    watermark = (
+        select(RollupWatermark.watermark)
+        .where(RollupWatermark.name == SALES_WATERMARK)
+        .with_for_update(read=True)
+        .cte("sales_watermark")
+    )
+
+    def delta(rollup: type[HourlySales] | type[DailySales], unit: str) -> CTE:
+        # on the Core table: an ORM-enabled INSERT in a CTE takes over the
+        # RETURNING rows of the ORM statement it is attached to
+        table = rollup.__table__
+        bucket = func.date_trunc(unit, changes.c.created_at)
+        upsert = pg_insert(table).from_select(
+            ["bucket", "product_id", "units", "revenue"],
+            select(bucket, changes.c.product_id, changes.c.units, changes.c.units * Product.price)
+            .join_from(changes, Product, Product.id == changes.c.product_id)
+            .where(bucket < func.date_trunc(unit, watermark.c.watermark)),
+        )
+        return upsert.on_conflict_do_update(
+            constraint=f"uq_{table.name}_bucket_product",
+            set_={
+                "units": table.c.units + upsert.excluded.units,
+                "revenue": table.c.revenue + upsert.excluded.revenue,
+            },
+        ).returning(table.c.id).cte(f"{table.name}_delta")
+
+    return delta(HourlySales, "hour"), delta(DailySales, "day")
+
+
+async def get_top_products(
+        session: AsyncSession,
+        rollup: type[HourlySales] | type[DailySales],
+        since: datetime,
+        limit: int = 10,
+        by: Literal["revenue", "units"] = "revenue",
+) -> list[TopProduct]:
+    units = func.sum(rollup.units).label("units")
+    revenue = func.sum(rollup.revenue).label("revenue")
+    stmt = (
+        select(rollup.product_id, units, revenue)
+        .where(rollup.bucket >= since)
+        .group_by(rollup.product_id)
+        .order_by((revenue if by == "revenue" else units).desc(), rollup.product_id)
+        .limit(limit)
+    )
+    result: Result = await session.execute(stmt)
+    return [TopProduct(product_id=row.product_id, units=row.units, revenue=row.revenue) for row in result]
@@ -0,0 +1,38 @@
+import re
+from datetime import datetime, timedelta
+from typing import Annotated, NamedTuple
+
+from fastapi import Query, HTTPException
+from starlette import status
+
+from core.models import DailySales, HourlySales
+
+WINDOW = re.compile(r"^([1-9]\d*)([hd])$")
+MAX_HOURS = 7 * 24
+MAX_DAYS = 366
+
+
+class RollupWindow(NamedTuple):
+    window: str
+    rollup: type[HourlySales] | type[DailySales]
+    since: datetime
+
+
+def rollup_window(
+        window: Annotated[str, Query(description="Trailing window, e.g. 6h, 24h, 7d, 30d")] = "24h",
+) -> RollupWindow:
+    # hour windows read the hourly rollup, day windows the daily one; both
+    # count the current, still open bucket as the last one
+    match = WINDOW.match(window)
+    if match is None or (match[2] == "h" and int(match[1]) > MAX_HOURS) or int(match[1]) > MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid window {window!r}: use 1h..{MAX_HOURS}h or 1d..{MAX_DAYS}d",
+        )
+    count, unit = int(match[1]), match[2]
+    now = datetime.utcnow()
+    if unit == "h":
+        since = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=count - 1)
+        return RollupWindow(window, HourlySales, since)
+    since = now.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=count - 1)
+    return RollupWindow(window, DailySales, since)
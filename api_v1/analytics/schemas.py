@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class TopProduct(BaseModel):
+    product_id: int
+    units: int
+    revenue: int
+
+
+class TopProductsReport(BaseModel):
+    window: str
+    since: datetime
+    # rollups include orders created before this moment
+    as_of: datetime | None
+    items: list[TopProduct]
@@ -0,0 +1,33 @@
+from typing import Annotated, Literal
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models import db_helper
+from . import crud
+from .dependencies import RollupWindow, rollup_window
+from .schemas import TopProductsReport
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/top-products/", response_model=TopProductsReport)
+async def get_top_products(
+        window: RollupWindow = Depends(rollup_window),
+        limit: Annotated[int, Query(ge=1, le=100)] = 10,
+        by: Literal["revenue", "units"] = "revenue",
+        session: AsyncSession = Depends(db_helper.read_session_dependency),
+):
+    # reads the rollup tables only, never the raw orders
+    return TopProductsReport(
+        window=window.window,
+        since=window.since,
+        as_of=await crud.get_watermark(session, crud.SALES_WATERMARK),
+        items=await crud.get_top_products(
+            session=session,
+            rollup=window.rollup,
+            since=window.since,
+            limit=limit,
+            by=by,
+        ),
+    )
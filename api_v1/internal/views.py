@@ -0,0 +1,40 @@
+from fastapi import APIRouter
+
+from api_v1.products.cache import product_cache, product_reads
+from core.cache import CacheStats
+from core.db_pool import PoolStats
+from core.models import db_helper
+from core.models.db_helper import ReplicaStatus
+from core.query_cache import QueryCacheStats, query_cache
+from core.singleflight import SingleFlightStats
+
+router = APIRouter(prefix="/internal", tags=["Internal"])
+
+
+@router.get("/cache-stats/", response_model=dict[str, CacheStats])
+def get_cache_stats():
+    return {
+        "products": product_cache.stats(),
+    }
+
+
+@router.get("/coalescing-stats/", response_model=dict[str, SingleFlightStats])
+def get_coalescing_stats():
+    return {
+        "products": product_reads.stats(),
+    }
+
+
+@router.get("/db-pool/", response_model=PoolStats)
+def get_db_pool_stats():
+    return db_helper.pool_stats()
+
+
+@router.get("/db-replicas/", response_model=list[ReplicaStatus])
+def get_db_replicas():
+    return db_helper.replica_statuses()
+
+
+@router.get("/query-cache/", response_model=QueryCacheStats)
+def get_query_cache_stats():
+    return query_cache.stats()
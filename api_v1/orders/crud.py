@@ -0,0 +1,510 @@
+from datetime import datetime
+
+from sqlalchemy import Integer, Select, and_, String, column, delete, func, insert, literal, or_, select, true, tuple_, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Result
+from sqlalchemy.sql.expression import CTE, ScalarSelect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, selectinload
+
+from api_v1.analytics.crud import sales_rollup_deltas
+from core.models import ArchivedOrder, ArchivedOrderLine, Order, OrderProductAssociation, Product, Stock, utc_now
+
+from .schemas import OrderCreate, OrderLineCreate, OrderLineChange
+from .schemas import Order as OrderSchema
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids: list[int]):
+        super().__init__(f"Insufficient stock for products {product_ids}")
+        self.product_ids = product_ids
+
+
+def lines_cte(counts: dict[int, int]) -> CTE:
+    lines_values = values(
+        column("product_id", Integer),
+        column("count", Integer),
+        name="lines_values",
+    ).data(list(counts.items()))
+    return select(lines_values.c.product_id, lines_values.c.count).cte("lines")
+
+
+def stock_reservation(lines: CTE) -> tuple[ScalarSelect, ScalarSelect]:
+    """Reserve stock for ``lines`` inside the statement that uses the result.
+
+    The tracked rows are locked in product_id order, so multi-line carts
+    cannot deadlock each other, then each is decremented only if enough is
+    left (UPDATE ... WHERE quantity >= n). A hot SKU is held only for the
+    one statement and its commit. Returns (tracked, reserved) row counts;
+    they differ when some line could not be covered.
+    """
+    locked = (
+        select(Stock.id)
+        .where(Stock.product_id.in_(select(lines.c.product_id)))
+        .order_by(Stock.product_id)
+        .with_for_update()
+        .cte("locked_stock")
+    )
+    reserved = (
+        update(Stock)
+        .where(
+            Stock.id == locked.c.id,
+            Stock.product_id == lines.c.product_id,
+            Stock.quantity >= lines.c.count,
+        )
+        .values(quantity=Stock.quantity - lines.c.count)
+        .returning(Stock.product_id)
+        .cte("reserved_stock")
+    )
+    return (
+        select(func.count()).select_from(locked).scalar_subquery(),
+        select(func.count()).select_from(reserved).scalar_subquery(),
+    )
+
+
+async def raise_insufficient_stock(session: AsyncSession, counts: dict[int, int]) -> None:
+    # the failed statement already reserved nothing; report what is short now
+    await session.rollback()
+    stmt = select(Stock.product_id, Stock.quantity).where(Stock.product_id.in_(counts))
+    result: Result = await session.execute(stmt)
+    raise InsufficientStock(
+        sorted(product_id for product_id, quantity in result if quantity < counts[product_id])
+    )
+
+
+def merge_lines(order_in: OrderCreate) -> dict[int, int]:
+    # the same product twice in a cart is one line (idx_unique_order_product)
+    counts: dict[int, int] = {}
+    for line in order_in.items:
+        counts[line.product_id] = counts.get(line.product_id, 0) + line.count
+    return counts
+
+
+async def create_order(session: AsyncSession, order_in: OrderCreate, commit: bool = True) -> OrderSchema:
+    """Reserve stock, insert the order and all of its lines in one statement.
+
+    WITH lines AS (SELECT * FROM (VALUES ...) lines),
+         locked_stock AS (SELECT ... FOR UPDATE), reserved_stock AS (UPDATE stocks ...),
+         new_order AS (INSERT INTO orders (promocode, total, items_count)
+                       SELECT ..., sum(lines.count * products.price), sum(lines.count)
+                       FROM lines JOIN products ... RETURNING ...),
+         new_lines AS (INSERT INTO order_product_association ...
+                       SELECT new_order.id, lines.* FROM new_order, lines
+                       RETURNING ...)
+    SELECT ..., tracked, reserved FROM new_order JOIN new_lines ...
+
+    With commit=False the transaction is left open for the caller.
+    """
+    counts = merge_lines(order_in)
+    lines = lines_cte(counts)
+    tracked, reserved = stock_reservation(lines)
+    # totals are computed from the same rows the lines are inserted from;
+    # unknown products drop out of the join here and fail the FK below.
+    # Python-side column defaults do not run for an INSERT inside a CTE,
+    # so created_at is set explicitly (to the column's server default)
+    new_order = (
+        insert(Order)
+        .from_select(
+            ["created_at", "promocode", "total", "items_count"],
+            select(
+                utc_now(),
+                literal(order_in.promocode, String),
+                func.coalesce(func.sum(lines.c.count * Product.price), 0),
+                func.coalesce(func.sum(lines.c.count), 0),
+            ).join_from(lines, Product, Product.id == lines.c.product_id),
+        )
+        .returning(Order.id, Order.promocode, Order.created_at, Order.total, Order.items_count)
+        .cte("new_order")
+    )
+    new_lines = (
+        insert(OrderProductAssociation)
+        .from_select(
+            ["order_id", "order_created_at", "product_id", "count"],
+            select(new_order.c.id, new_order.c.created_at, lines.c.product_id, lines.c.count),
+        )
+        .returning(
+            OrderProductAssociation.order_id,
+            OrderProductAssociation.product_id,
+            OrderProductAssociation.count,
+        )
+        .cte("new_lines")
+    )
+    stmt = (
+        select(
+            new_order.c.id,
+            new_order.c.promocode,
+            new_order.c.created_at,
+            new_order.c.total,
+            new_order.c.items_count,
+            new_lines.c.product_id,
+            new_lines.c.count,
+            tracked.label("tracked"),
+            reserved.label("reserved"),
+        )
+        .join_from(new_order, new_lines, new_lines.c.order_id == new_order.c.id)
+        .order_by(new_lines.c.product_id)
+    )
+    result: Result = await session.execute(stmt)
+    rows = result.all()
+    if rows[0].tracked != rows[0].reserved:
+        await raise_insufficient_stock(session, counts)
+    if commit:
+        await session.commit()
+
+    order_id, promocode, created_at, total, items_count = rows[0][:5]
+    return OrderSchema(
+        id=order_id,
+        promocode=promocode,
+        created_at=created_at,
+        total=total,
+        items_count=items_count,
+        items=[{"product_id": row.product_id, "count": row.count} for row in rows],
+    )
+
+
+def orders_page_stmt(
+        model: type[Order] | type[ArchivedOrder],
+        limit: int,
+        after: tuple[datetime, int] | None = None,
+) -> Select:
+    # newest first; the row-value comparison seeks the (created_at, id)
+    # index (scanned backwards), so a page costs the same at any depth.
+    # selectinload fetches the page's lines in one IN (...) query.
+    stmt = (
+        select(model)
+        .options(selectinload(model.products_details))
+        .order_by(model.created_at.desc(), model.id.desc())
+        .limit(limit)
+    )
+    if after is not None:
+        # the plain bound on created_at lets the planner prune newer partitions
+        stmt = stmt.where(
+            model.created_at <= after[0],
+            tuple_(model.created_at, model.id) < tuple_(*after),
+        )
+    return stmt
+
+
+async def get_orders(
+        session: AsyncSession,
+        limit: int = 20,
+        after: tuple[datetime, int] | None = None,
+) -> tuple[list[OrderSchema], tuple[datetime, int] | None]:
+    # one page from each table, merged on the keyset: the archive job skips
+    # locked orders, so the hot table can still hold orders older than
+    # archived ones and running out of it says nothing about the archive.
+    # The hot table is read first: an order archived in between shows up
+    # in both reads (and is kept once) rather than in neither.
+    pages: dict[int, Order | ArchivedOrder] = {}
+    for model in (Order, ArchivedOrder):
+        for order in await session.scalars(orders_page_stmt(model, limit=limit + 1, after=after)):
+            pages.setdefault(order.id, order)
+    orders = sorted(pages.values(), key=lambda order: (order.created_at, order.id), reverse=True)
+    last = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        last = orders[-1].created_at, orders[-1].id
+    return [OrderSchema.model_validate(order) for order in orders], last
+
+
+async def get_order(session: AsyncSession, order_id: int) -> OrderSchema | None:
+    # hot table first; archived orders are only read on a miss
+    for model in (Order, ArchivedOrder):
+        stmt = (
+            select(model)
+            .where(model.id == order_id)
+            .options(selectinload(model.products_details))
+        )
+        order = await session.scalar(stmt)
+        if order is not None:
+            return OrderSchema.model_validate(order)
+    return None
+
+
+async def add_order_line(
+        session: AsyncSession,
+        order_id: int,
+        line_in: OrderLineCreate,
+) -> OrderLineChange | None:
+    """Reserve stock, upsert the line and bump the order totals in one statement.
+
+    WITH line AS (INSERT ... ON CONFLICT (order_id, product_id) DO UPDATE ... RETURNING ...),
+         locked_stock AS (...), reserved_stock AS (...),
+         sales_hourly_delta AS (...), sales_daily_delta AS (...)
+    UPDATE orders SET total = total + n * products.price, items_count = items_count + n
+    FROM line, products ... RETURNING ...
+
+    Returns None if there is no such order.
+    """
+    # one atomic upsert on idx_unique_order_product: concurrent adds of the
+    # same product serialize on the row lock and never lose an increment.
+    # The line is inserted from the order row to copy its partition key.
+    upsert = pg_insert(OrderProductAssociation).from_select(
+        ["order_id", "order_created_at", "product_id", "count"],
+        select(
+            Order.id,
+            Order.created_at,
+            literal(line_in.product_id, Integer),
+            literal(line_in.count, Integer),
+        ).where(Order.id == order_id),
+    )
+    line = (
+        upsert.on_conflict_do_update(
+            constraint="idx_unique_order_product",
+            set_={"count": OrderProductAssociation.count + upsert.excluded.count},
+        )
+        .returning(
+            OrderProductAssociation.order_id,
+            OrderProductAssociation.order_created_at,
+            OrderProductAssociation.product_id,
+            OrderProductAssociation.count,
+        )
+        .cte("line")
+    )
+    counts = {line_in.product_id: line_in.count}
+    tracked, reserved = stock_reservation(lines_cte(counts))
+    changes = select(
+        line.c.order_created_at.label("created_at"),
+        line.c.product_id,
+        literal(line_in.count, Integer).label("units"),
+    ).cte("line_change")
+    stmt = (
+        update(Order)
+        .where(
+            Order.id == line.c.order_id,
+            Order.created_at == line.c.order_created_at,
+            Product.id == line.c.product_id,
+        )
+        .values(
+            total=Order.total + line_in.count * Product.price,
+            items_count=Order.items_count + line_in.count,
+        )
+        .returning(
+            line.c.product_id,
+            line.c.count,
+            Order.total,
+            Order.items_count,
+            tracked.label("tracked"),
+            reserved.label("reserved"),
+        )
+        .add_cte(*sales_rollup_deltas(changes))
+    )
+    # no "fetch" sync: it cannot match RETURNING rows from CTEs back to orders
+    result: Result = await session.execute(stmt, execution_options={"synchronize_session": False})
+    row = result.one_or_none()
+    if row is None:
+        # no order to attach the line to; undo the stock reservation
+        await session.rollback()
+        return None
+    if row.tracked != row.reserved:
+        await raise_insufficient_stock(session, counts)
+    await session.commit()
+    return OrderLineChange(
+        product_id=row.product_id,
+        count=row.count,
+        order_total=row.total,
+        order_items_count=row.items_count,
+    )
+
+
+async def remove_order_line(
+        session: AsyncSession,
+        order_id: int,
+        product_id: int,
+        count: int | None = None,
+) -> OrderLineChange | None:
+    """Take ``count`` items off a line (the whole line when None) in one statement.
+
+    The order totals, the product's stock (if tracked) and the sales rollups
+    (if already past the order) are adjusted by the same statement. The returned
+    count is what is left on the line (0 once it is gone); None if there
+    was no such line.
+    """
+    locked = (
+        select(
+            OrderProductAssociation.id,
+            OrderProductAssociation.order_created_at,
+            OrderProductAssociation.product_id,
+            OrderProductAssociation.count,
+        )
+        .where(
+            OrderProductAssociation.order_id == order_id,
+            OrderProductAssociation.product_id == product_id,
+        )
+        .with_for_update()
+        .cte("locked")
+    )
+    # both branches read the count from the locked row, so they see the
+    # latest committed value and exactly one of them applies
+    removed_condition = true() if count is None else locked.c.count <= count
+    removed = (
+        delete(OrderProductAssociation)
+        .where(
+            OrderProductAssociation.id == locked.c.id,
+            OrderProductAssociation.order_created_at == locked.c.order_created_at,
+            removed_condition,
+        )
+        .returning(literal(0).label("count"))
+        .cte("removed")
+    )
+    if count is None:
+        changed = select(removed.c.count).cte("changed")
+    else:
+        decremented = (
+            update(OrderProductAssociation)
+            .where(
+                OrderProductAssociation.id == locked.c.id,
+                OrderProductAssociation.order_created_at == locked.c.order_created_at,
+                locked.c.count > count,
+            )
+            .values(count=OrderProductAssociation.count - count)
+            .returning(OrderProductAssociation.count)
+            .cte("decremented")
+        )
+        changed = select(decremented.c.count).union_all(select(removed.c.count)).cte("changed")
+    taken = locked.c.count - changed.c.count
+    released = (
+        update(Stock)
+        .where(Stock.product_id == locked.c.product_id)
+        .values(quantity=Stock.quantity + taken)
+        .cte("released_stock")
+    )
+    changes = select(
+        locked.c.order_created_at.label("created_at"),
+        locked.c.product_id,
+        (-taken).label("units"),
+    ).cte("line_change")
+    stmt = (
+        update(Order)
+        .where(
+            Order.id == order_id,
+            Order.created_at == locked.c.order_created_at,
+            Product.id == locked.c.product_id,
+        )
+        .values(
+            total=Order.total - taken * Product.price,
+            items_count=Order.items_count - taken,
+        )
+        .returning(changed.c.count, Order.total, Order.items_count)
+        .add_cte(released, *sales_rollup_deltas(changes))
+    )
+    # no "fetch" sync, as in add_order_line; the commit expires the orders anyway
+    result: Result = await session.execute(stmt, execution_options={"synchronize_session": False})
+    row = result.one_or_none()
+    await session.commit()
+    if row is None:
+        return None
+    return OrderLineChange(
+        product_id=product_id,
+        count=row.count,
+        order_total=row.total,
+        order_items_count=row.items_count,
+    )
+
+
+async def recompute_order_totals(
+        session: AsyncSession,
+        min_id: int,
+        max_id: int,
+) -> int:
+    """Rebuild total/items_count for orders with min_id <= id < max_id.
+
+    UPDATE orders SET total = agg.total, items_count = agg.items_count
+    FROM (SELECT orders.id, sum(count * price), sum(count)
+          FROM orders LEFT JOIN order_product_association ... GROUP BY orders.id) agg
+    WHERE orders.id = agg.id AND (the stored values differ)
+
+    Returns the number of orders that had drifted.
+    """
+    opa = OrderProductAssociation
+    orders = aliased(Order)
+    agg = (
+        select(
+            orders.id,
+            orders.created_at,
+            func.coalesce(func.sum(opa.count * Product.price), 0).label("total"),
+            func.coalesce(func.sum(opa.count), 0).label("items_count"),
+        )
+        .outerjoin(opa, and_(opa.order_id == orders.id, opa.order_created_at == orders.created_at))
+        .outerjoin(Product, Product.id == opa.product_id)
+        .where(orders.id >= min_id, orders.id < max_id)
+        .group_by(orders.id, orders.created_at)
+        .subquery("agg")
+    )
+    stmt = (
+        update(Order)
+        .where(
+            Order.id == agg.c.id,
+            Order.created_at == agg.c.created_at,
+            or_(Order.total != agg.c.total, Order.items_count != agg.c.items_count),
+        )
+        .values(total=agg.c.total, items_count=agg.c.items_count)
+        .returning(Order.id)
+    )
+    result: Result = await session.execute(stmt)
+    repaired = len(result.all())
+    await session.commit()
+    return repaired
+
+
+async def archive_orders(
+        session: AsyncSession,
+        before: datetime,
+        batch_size: int,
+) -> tuple[int, int]:
+    """Move one batch of orders created before ``before`` into the archive.
+
+    WITH batch AS (SELECT ... ORDER BY created_at, id LIMIT n FOR UPDATE SKIP LOCKED),
+         moved_orders AS (DELETE FROM orders USING batch ... RETURNING ...),
+         moved_lines AS (DELETE FROM order_product_association USING moved_orders ... RETURNING ...),
+         archived_orders AS (INSERT INTO orders_archive SELECT ... FROM moved_orders RETURNING id),
+         archived_lines AS (INSERT INTO order_product_association_archive SELECT ... FROM moved_lines RETURNING id)
+    SELECT count(archived_orders), count(archived_lines)
+
+    Rows locked by live traffic are skipped and picked up by a later batch.
+    Returns the number of orders and lines moved.
+    """
+    opa = OrderProductAssociation
+    batch = (
+        select(Order.id, Order.created_at)
+        .where(Order.created_at < before)
+        .order_by(Order.created_at, Order.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("batch")
+    )
+    moved_orders = (
+        delete(Order)
+        .where(Order.id == batch.c.id, Order.created_at == batch.c.created_at)
+        .returning(Order.id, Order.promocode, Order.created_at, Order.total, Order.items_count)
+        .cte("moved_orders")
+    )
+    moved_lines = (
+        delete(opa)
+        .where(opa.order_id == moved_orders.c.id, opa.order_created_at == moved_orders.c.created_at)
+        .returning(opa.id, opa.order_id, opa.product_id, opa.count)
+        .cte("moved_lines")
+    )
+    archived_orders = (
+        insert(ArchivedOrder)
+        .from_select(
+            ["id", "promocode", "created_at", "total", "items_count"],
+            select(moved_orders),
+        )
+        .returning(ArchivedOrder.id)
+        .cte("archived_orders")
+    )
+    archived_lines = (
+        insert(ArchivedOrderLine)
+        .from_select(["id", "order_id", "product_id", "count"], select(moved_lines))
+        .returning(ArchivedOrderLine.id)
+        .cte("archived_lines")
+    )
+    stmt = select(
+        select(func.count()).select_from(archived_orders).scalar_subquery(),
+        select(func.count()).select_from(archived_lines).scalar_subquery(),
+    )
+    result: Result = await session.execute(stmt)
+    orders_moved, lines_moved = result.one()
+    await session.commit()
+    return orders_moved, lines_moved
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import Path, Query, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+from core.models import db_helper
+from core.pagination import decode_cursor
+from . import crud
+from .schemas import Order
+
+
+async def order_by_id(
+        order_id: Annotated[int, Path],
+        session: AsyncSession = Depends(db_helper.read_session_dependency),
+) -> Order:
+    order = await crud.get_order(session=session, order_id=order_id)
+    if order is not None:
+        return order
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Order {order_id} not found!"
+    )
+
+
+def after_order(
+        after: Annotated[str | None, Query(description="Opaque cursor from the previous page")] = None,
+) -> tuple[datetime, int] | None:
+    if after is None:
+        return None
+    try:
+        cursor = decode_cursor(after)
+        return datetime.fromisoformat(cursor["created_at"]), int(cursor["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import Annotated
+
+from annotated_types import Ge, MinLen
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
+
+
+class OrderLineCreate(BaseModel):
+    product_id: int
+    count: Annotated[int, Ge(1)] = 1
+
+
+class OrderCreate(BaseModel):
+    promocode: str | None = None
+    items: Annotated[list[OrderLineCreate], MinLen(1)]
+
+
+class OrderLine(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    product_id: int
+    count: int
+
+
+class OrderLineChange(OrderLine):
+    order_total: int
+    order_items_count: int
+
+
+class Order(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    promocode: str | None
+    created_at: datetime
+    total: int
+    items_count: int
+    items: list[OrderLine] = Field(validation_alias=AliasChoices("items", "products_details"))
+
+
+class OrdersPage(BaseModel):
+    items: list[Order]
+    next_cursor: str | None = None
@@ -0,0 +1,112 @@
+from datetime import datetime
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, status, Depends, Path, Query
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.idempotency import idempotency_key, idempotency_store
+from core.models import db_helper
+from core.pagination import encode_cursor
+from . import crud
+from .dependencies import order_by_id, after_order
+from .schemas import Order, OrdersPage, OrderCreate, OrderLineChange, OrderLineCreate
+
+router = APIRouter(tags=["Orders"])
+
+
+def insufficient_stock(e: crud.InsufficientStock) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail={"message": "Insufficient stock", "product_ids": e.product_ids},
+    )
+
+
+@router.post("/", response_model=Order, status_code=status.HTTP_201_CREATED)
+async def create_order(
+        order_in: OrderCreate,
+        key: str | None = Depends(idempotency_key),
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
+):
+    try:
+        if key is None:
+            return await crud.create_order(session=session, order_in=order_in)
+        return await idempotency_store.respond(
+            session=session,
+            scope="orders:create",
+            key=key,
+            payload=order_in,
+            fn=lambda: crud.create_order(session=session, order_in=order_in, commit=False),
+            response_model=Order,
+            status_code=status.HTTP_201_CREATED,
+        )
+    except crud.InsufficientStock as e:
+        raise insufficient_stock(e)
+    except IntegrityError:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Order references unknown products",
+        )
+
+
+@router.get("/", response_model=OrdersPage)
+async def get_orders(
+        limit: Annotated[int, Query(ge=1, le=100)] = 20,
+        after: tuple[datetime, int] | None = Depends(after_order),
+        session: AsyncSession = Depends(db_helper.read_session_dependency),
+):
+    orders, last = await crud.get_orders(session=session, limit=limit, after=after)
+    return OrdersPage(
+        items=orders,
+        next_cursor=encode_cursor({"created_at": last[0].isoformat(), "id": last[1]}) if last is not None else None,
+    )
+
+
+@router.get("/{order_id}/", response_model=Order)
+async def get_order(
+        order: Order = Depends(order_by_id),
+):
+    return order
+
+
+@router.post("/{order_id}/lines/", response_model=OrderLineChange)
+async def add_order_line(
+        order_id: Annotated[int, Path],
+        line_in: OrderLineCreate,
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
+):
+    try:
+        line = await crud.add_order_line(session=session, order_id=order_id, line_in=line_in)
+    except crud.InsufficientStock as e:
+        raise insufficient_stock(e)
+    except IntegrityError:
+        await session.rollback()
+        line = None
+    if line is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Order {order_id} or product {line_in.product_id} not found!",
+        )
+    return line
+
+
+@router.delete("/{order_id}/lines/{product_id}/", response_model=OrderLineChange)
+async def remove_order_line(
+        order_id: Annotated[int, Path],
+        product_id: Annotated[int, Path],
+        count: Annotated[int | None, Query(ge=1, description="Items to remove; the whole line if omitted")] = None,
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
+):
+    line = await crud.remove_order_line(
+        session=session,
+        order_id=order_id,
+        product_id=product_id,
+        count=count,
+    )
+    if line is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product {product_id} is not in order {order_id}",
+        )
+    return line
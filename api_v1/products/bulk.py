@@ -0,0 +1,111 @@
+import json
+from time import perf_counter
+from typing import Any, AsyncIterator
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+from .shemas import ProductBulkCreate, ProductBulkItem, ProductBulkResult
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+ParsedRow = tuple[int, ProductBulkCreate | str]
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(map(str, err['loc'])) or 'body'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+def parse_product(index: int, raw: Any) -> ParsedRow:
+    try:
+        if isinstance(raw, (bytes, str)):
+            return index, ProductBulkCreate.model_validate_json(raw)
+        return index, ProductBulkCreate.model_validate(raw)
+    except ValidationError as e:
+        return index, format_validation_error(e)
+
+
+async def iter_ndjson_rows(request: Request) -> AsyncIterator[ParsedRow]:
+    index = 0
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield parse_product(index, line)
+                index += 1
+    if buffer.strip():
+        yield parse_product(index, buffer)
+
+
+async def iter_json_rows(request: Request) -> AsyncIterator[ParsedRow]:
+    try:
+        payload = json.loads(await request.body())
+    except ValueError:
+        payload = None
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Expected a JSON array of products or {NDJSON_MEDIA_TYPE}",
+        )
+    for index, raw in enumerate(payload):
+        yield parse_product(index, raw)
+
+
+async def product_chunks(request: Request, chunk_size: int) -> AsyncIterator[list[ParsedRow]]:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(NDJSON_MEDIA_TYPE):
+        rows = iter_ndjson_rows(request)
+    else:
+        rows = iter_json_rows(request)
+    chunk: list[ParsedRow] = []
+    async for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def upsert_from_request(
+        session: AsyncSession,
+        request: Request,
+        chunk_size: int,
+) -> ProductBulkResult:
+    started = perf_counter()
+    items: list[ProductBulkItem] = []
+    async for chunk in product_chunks(request, chunk_size):
+        valid = [(index, product) for index, product in chunk if isinstance(product, ProductBulkCreate)]
+        items.extend(
+            ProductBulkItem(index=index, status="invalid", error=error)
+            for index, error in chunk
+            if isinstance(error, str)
+        )
+        if not valid:
+            continue
+        results = await crud.upsert_products(
+            session=session,
+            products_in=[product for _, product in valid],
+        )
+        items.extend(
+            ProductBulkItem(index=index, id=product_id, status="created" if created else "updated")
+            for (index, _), (product_id, created) in zip(valid, results)
+        )
+
+    items.sort(key=lambda item: item.index)
+    elapsed = perf_counter() - started
+    return ProductBulkResult(
+        items=items,
+        created=sum(item.status == "created" for item in items),
+        updated=sum(item.status == "updated" for item in items),
+        invalid=sum(item.status == "invalid" for item in items),
+        elapsed_seconds=round(elapsed, 6),
+        rows_per_second=round(len(items) / elapsed, 2) if elapsed else 0.0,
+    )
@@ -0,0 +1,24 @@
+from core.cache import LRUCache
+from core.config import settings
+from core.singleflight import SingleFlight
+
+from .shemas import Product
+
+
+class Deleted:
+    """Tombstone a delete leaves in product_cache until it expires."""
+
+
+# a read that started before the delete can't put the product back over it
+DELETED = Deleted()
+
+# serialized products keyed by id, filled by crud.get_cached_product and
+# kept current by the crud write paths (crud.cache_product never lets an
+# older version replace a newer one, nor anything replace a tombstone)
+product_cache: LRUCache[int, Product | Deleted] = LRUCache(
+    max_size=settings.product_cache.max_size,
+    ttl=settings.product_cache.ttl_seconds,
+)
+
+# identical concurrent reads share one query instead of one connection each
+product_reads = SingleFlight()
@@ -1,45 +1,349 @@
-from sqlalchemy import select
-from sqlalchemy.engine import Result
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Sequence, TypeVar
+
+from sqlalchemy import select, update, delete, Select, Boolean, literal_column, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Result, Row
 from sqlalchemy.ext.asyncio import AsyncSession
-from core.models import Product
+from core.models import Product, RelatedProduct, Stock
+from core.models.db_helper import is_replica_session, reads_own_writes
+
+from .cache import DELETED, product_cache, product_reads
+from .search import search_stmt
+from .shemas import ProductBulkCreate, ProductCreate, ProductUpdate, ProductUpdatePartial, ProductFilter, ProductStock
+from .shemas import Product as ProductSchema
+
+T = TypeVar("T")
+
+
+def apply_product_filter(stmt: Select, product_filter: ProductFilter | None) -> Select:
+    if product_filter is None:
+        return stmt
+    if product_filter.name:
+        stmt = stmt.where(Product.name.ilike(f"%{product_filter.name}%"))
+    if product_filter.min_price is not None:
+        stmt = stmt.where(Product.price >= product_filter.min_price)
+    if product_filter.max_price is not None:
+        stmt = stmt.where(Product.price <= product_filter.max_price)
+    return stmt
+
+
+def products_page_stmt(
+        *entities,
+        limit: int,
+        after: int | None = None,
+        product_filter: ProductFilter | None = None,
+) -> Select:
+    # keyset pagination: seek past the last seen id instead of OFFSET,
+    # so every page is a single index range scan on the primary key.
+    # One extra row is fetched to tell whether there is a next page.
+    stmt = select(*entities).order_by(Product.id).limit(limit + 1).execution_options(query_cache=True)
+    if after is not None:
+        stmt = stmt.where(Product.id > after)
+    return apply_product_filter(stmt, product_filter)
+
 
-from .shemas import ProductCreate, ProductUpdate, ProductUpdatePartial
+async def coalesced_read(
+        session: AsyncSession,
+        key: tuple[Hashable, ...],
+        load: Callable[[], Awaitable[T]],
+) -> T:
+    # only reads against the same database share a flight; a client reading
+    # its own writes must not join one that may have started before them
+    if reads_own_writes(session):
+        return await load()
+    return await product_reads.do((session.bind, *key), load)
+
+
+def cached_product(session: AsyncSession, product_id: int) -> ProductSchema | None:
+    if reads_own_writes(session):
+        return None
+    cached = product_cache.get(product_id)
+    return None if cached is DELETED else cached
+
+
+def cache_product(product: ProductSchema) -> None:
+    # a read that started before a write can finish after it: never let its
+    # row replace the newer version or the tombstone the writer put in place
+    cached = product_cache.peek(product.id)
+    if cached is None or (cached is not DELETED and cached.version < product.version):
+        product_cache.set(product.id, product)
+
+
+async def get_products(
+        session: AsyncSession,
+        limit: int = 50,
+        after: int | None = None,
+        product_filter: ProductFilter | None = None,
+) -> tuple[list[ProductSchema], int | None]:
+    # plain rows, serialized once: the page is shared with every request
+    # joining the flight, which must not see the leader session's instances
+    stmt = products_page_stmt(*Product.__table__.columns, limit=limit, after=after, product_filter=product_filter)
 
+    async def load() -> list[ProductSchema]:
+        result: Result = await session.execute(stmt)
+        return [ProductSchema.model_validate(row) for row in result.mappings()]
 
-async def get_products(session: AsyncSession) -> list[Product]:
-    stmt = select(Product).order_by(Product.id)
+    products = await coalesced_read(session, ("products", limit, after, product_filter), load)
+    if len(products) > limit:
+        products = products[:limit]
+        return products, products[-1].id
+    return products, None
+
+
+def product_columns(fields: Sequence[str]) -> list:
+    # id and version are always selected: they drive the cursor and the ETag
+    names = dict.fromkeys(("id", "version", *fields))
+    return [Product.__table__.c[name] for name in names]
+
+
+async def get_product_rows(
+        session: AsyncSession,
+        fields: Sequence[str],
+        limit: int = 50,
+        after: int | None = None,
+        product_filter: ProductFilter | None = None,
+) -> tuple[list[dict[str, Any]], int | None]:
+    # column select: unrequested columns are never fetched nor hydrated
+    stmt = products_page_stmt(
+        *product_columns(fields),
+        limit=limit,
+        after=after,
+        product_filter=product_filter,
+    )
+
+    async def load() -> list[dict[str, Any]]:
+        result: Result = await session.execute(stmt)
+        return [dict(row) for row in result.mappings()]
+
+    rows = await coalesced_read(session, ("product_rows", tuple(fields), limit, after, product_filter), load)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1]["id"]
+    return rows, None
+
+
+async def get_product_versions(
+        session: AsyncSession,
+        limit: int = 50,
+        after: int | None = None,
+        product_filter: ProductFilter | None = None,
+) -> tuple[list[tuple[int, int]], bool]:
+    # same page as get_products, but only (id, version) pairs: enough to
+    # answer a conditional request without loading or hydrating full rows
+    stmt = products_page_stmt(
+        Product.id,
+        Product.version,
+        limit=limit,
+        after=after,
+        product_filter=product_filter,
+    )
     result: Result = await session.execute(stmt)
-    products = result.scalars().all()
-    return list(products)
+    versions = list(result.tuples().all())
+    return versions[:limit], len(versions) > limit
+
+
+async def search_products(
+        session: AsyncSession,
+        q: str,
+        limit: int = 20,
+        after: tuple[float, int] | None = None,
+) -> tuple[list[tuple[Product, float]], tuple[float, int] | None]:
+    stmt = search_stmt(session.bind.dialect.name, q=q, limit=limit, after=after).execution_options(query_cache=True)
+    result: Result = await session.execute(stmt)
+    hits = list(result.tuples().all())
+    if len(hits) > limit:
+        hits = hits[:limit]
+        product, rank = hits[-1]
+        return hits, (rank, product.id)
+    return hits, None
+
+
+async def stream_products(
+        session: AsyncSession,
+        batch_size: int = 1000,
+        product_filter: ProductFilter | None = None,
+) -> AsyncIterator[Sequence[Row]]:
+    # server-side cursor over plain rows: nothing is kept in the identity
+    # map, so memory stays at one batch regardless of the table size
+    stmt = select(*Product.__table__.columns).order_by(Product.id)
+    stmt = apply_product_filter(stmt, product_filter)
+    result = await session.stream(stmt.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows
 
 
 async def get_product(session: AsyncSession, product_id: int) -> Product | None:
-    return await session.get(Product, product_id)
+    return await session.get(Product, product_id, execution_options={"query_cache": True})
+
+
+async def get_product_version(session: AsyncSession, product_id: int) -> int | None:
+    cached = cached_product(session, product_id)
+    if cached is not None:
+        return cached.version
+    return await session.scalar(
+        select(Product.version).where(Product.id == product_id).execution_options(query_cache=True)
+    )
+
+
+async def get_cached_product(session: AsyncSession, product_id: int) -> ProductSchema | None:
+    # read-through: hot products are served without touching the DB or the ORM
+    cached = cached_product(session, product_id)
+    if cached is not None:
+        return cached
+
+    async def load() -> ProductSchema | None:
+        product = await get_product(session=session, product_id=product_id)
+        return ProductSchema.model_validate(product) if product is not None else None
+
+    cached = await coalesced_read(session, ("product", product_id), load)
+    # only the primary fills the cache: a lagging replica could put back
+    # a row older than the write that just invalidated it
+    if cached is not None and not is_replica_session(session):
+        cache_product(cached)
+    return cached
 
 
-async def create_product(session: AsyncSession, product_in: ProductCreate) -> Product:
+async def get_product_row(
+        session: AsyncSession,
+        product_id: int,
+        fields: Sequence[str],
+) -> dict[str, Any] | None:
+    cached = cached_product(session, product_id)
+    if cached is not None:
+        return cached.model_dump(include={"id", "version", *fields})
+    stmt = select(*product_columns(fields)).where(Product.id == product_id).execution_options(query_cache=True)
+    result: Result = await session.execute(stmt)
+    row = result.mappings().one_or_none()
+    return dict(row) if row is not None else None
+
+
+async def create_product(session: AsyncSession, product_in: ProductCreate, commit: bool = True) -> Product:
+    # commit=False leaves the transaction open for the caller (idempotency keys)
     product = Product(**product_in.model_dump())
     session.add(product)
-    await session.commit()
+    if commit:
+        await session.commit()
+    else:
+        await session.flush()
     # await session.refresh(product)
     return product
 
 
+async def upsert_products(
+        session: AsyncSession,
+        products_in: list[ProductBulkCreate],
+) -> list[tuple[int, bool]]:
+    """Insert or update products keyed on sku in one multi-row statement.
+
+    Returns ``(id, created)`` for every input, in input order.
+    """
+    rows = [product_in.model_dump() for product_in in products_in]
+    # ON CONFLICT cannot touch the same row twice in one statement,
+    # so repeated skus within a chunk collapse onto their last occurrence
+    last_by_sku = {row["sku"]: row for row in rows}
+
+    stmt = insert(Product).values(list(last_by_sku.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.sku],
+        set_={
+            "name": stmt.excluded.name,
+            "description": stmt.excluded.description,
+            "price": stmt.excluded.price,
+            "version": Product.version + 1,
+            "updated_at": func.now(),
+        },
+    ).returning(
+        Product.id,
+        # xmax is zero only for freshly inserted tuples
+        literal_column("xmax = 0", Boolean).label("created"),
+        Product.sku,
+        Product.name,
+        Product.description,
+        Product.price,
+        Product.version,
+    )
+    result: Result = await session.execute(stmt)
+    # RETURNING rows come back in no particular order: match them on sku
+    returned: dict[str, tuple[int, bool]] = {}
+    updated = []
+    for row in result:
+        returned[row.sku] = row.id, row.created
+        if not row.created:
+            updated.append(ProductSchema.model_validate(row))
+    await session.commit()
+    for product in updated:
+        cache_product(product)
+
+    return [returned[row["sku"]] for row in rows]
+
+
 async def update_product(
         session: AsyncSession,
-        product: Product,
+        product_id: int,
         product_update: ProductUpdate | ProductUpdatePartial,
         partial: bool = False
-) -> Product:
-    for name, value in product_update.model_dump(exclude_unset=partial).items():
-        setattr(product, name, value)
+) -> Product | None:
+    # single UPDATE ... RETURNING: no prior SELECT, no hydration before the write
+    values = product_update.model_dump(exclude_unset=partial)
+    if not values:
+        return await get_product(session=session, product_id=product_id)
+    stmt = (
+        update(Product)
+        .where(Product.id == product_id)
+        .values(**values, version=Product.version + 1)
+        .returning(Product)
+    )
+    product = await session.scalar(stmt)
     await session.commit()
+    if product is not None:
+        cache_product(ProductSchema.model_validate(product))
     return product
 
 
 async def delete_product(
         session: AsyncSession,
-        product: Product
-) -> None:
-    await session.delete(product)
+        product_id: int,
+) -> bool:
+    stmt = delete(Product).where(Product.id == product_id).returning(Product.id)
+    deleted_id = await session.scalar(stmt)
+    await session.commit()
+    product_cache.set(product_id, DELETED)
+    return deleted_id is not None
+
+
+async def get_related_products(
+        session: AsyncSession,
+        product_id: int,
+        limit: int = 10,
+) -> list[tuple[Product, int]]:
+    # precomputed by jobs/related_products.py: one range scan on
+    # uq_related_products_rank plus primary key lookups, no order data read
+    stmt = (
+        select(Product, RelatedProduct.count)
+        .join(RelatedProduct, RelatedProduct.related_id == Product.id)
+        .where(RelatedProduct.product_id == product_id)
+        .order_by(RelatedProduct.rank)
+        .limit(limit)
+        .execution_options(query_cache=True)
+    )
+    result: Result = await session.execute(stmt)
+    return [(product, count) for product, count in result]
+
+
+async def get_stock(session: AsyncSession, product_id: int) -> ProductStock | None:
+    quantity = await session.scalar(select(Stock.quantity).where(Stock.product_id == product_id))
+    if quantity is None:
+        return None
+    return ProductStock(product_id=product_id, quantity=quantity)
+
+
+async def set_stock(session: AsyncSession, product_id: int, quantity: int) -> ProductStock:
+    # absolute restock; reservations decrement the same row in place
+    stmt = insert(Stock).values(product_id=product_id, quantity=quantity)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Stock.product_id],
+        set_={"quantity": stmt.excluded.quantity},
+    )
+    await session.execute(stmt)
     await session.commit()
+    return ProductStock(product_id=product_id, quantity=quantity)
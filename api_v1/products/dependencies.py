@@ -1,21 +1,83 @@
 from typing import Annotated
 
-from fastapi import Path, Depends, HTTPException
+from fastapi import Path, Query, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from core.models import db_helper, Product
+from core.models import db_helper
+from core.pagination import decode_cursor
 from . import crud
+from .shemas import ProductFilter
+from .shemas import Product as ProductSchema
 
 
-async def product_by_id(
+def product_not_found(product_id: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Product {product_id} not found!"
+    )
+
+
+async def cached_product_by_id(
         product_id: Annotated[int, Path],
-        session: AsyncSession = Depends(db_helper.scoped_session_dependency),
-) -> Product:
-    product = await crud.get_product(session=session, product_id=product_id)
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
+) -> ProductSchema:
+    product = await crud.get_cached_product(session=session, product_id=product_id)
     if product is not None:
         return product
-    raise HTTPException(
-        status_code=status.HTTP_404_NOT_FOUND,
-        detail=f"Product {product_id} not found!"
-    )
\ No newline at end of file
+    raise product_not_found(product_id)
+
+
+def product_filter(
+        name: Annotated[str | None, Query(max_length=100)] = None,
+        min_price: Annotated[int | None, Query(ge=0)] = None,
+        max_price: Annotated[int | None, Query(ge=0)] = None,
+) -> ProductFilter:
+    return ProductFilter(name=name, min_price=min_price, max_price=max_price)
+
+
+def product_fields(
+        fields: Annotated[
+            str | None,
+            Query(description="Comma-separated subset of product fields, e.g. id,name,price"),
+        ] = None,
+) -> tuple[str, ...] | None:
+    if not fields:
+        return None
+    requested = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in requested if field not in ProductSchema.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}",
+        )
+    return requested or None
+
+
+def after_product_id(
+        after: Annotated[str | None, Query(description="Opaque cursor from the previous page")] = None,
+) -> int | None:
+    if after is None:
+        return None
+    try:
+        return int(decode_cursor(after)["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+def after_search_hit(
+        after: Annotated[str | None, Query(description="Opaque cursor from the previous page")] = None,
+) -> tuple[float, int] | None:
+    if after is None:
+        return None
+    try:
+        cursor = decode_cursor(after)
+        return float(cursor["rank"]), int(cursor["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
@@ -0,0 +1,31 @@
+import hashlib
+from typing import Iterable
+
+from fastapi import Response, status
+
+
+def product_etag(product_id: int, version: int, variant: str = "") -> str:
+    # variant tells apart different representations of the same version,
+    # e.g. sparse fieldsets
+    return f'"p{product_id}v{version}{variant and "-" + variant}"'
+
+
+def page_etag(versions: Iterable[tuple[int, int]], has_more: bool, variant: str = "") -> str:
+    digest = hashlib.sha1(variant.encode())
+    for product_id, version in versions:
+        digest.update(f"{product_id}:{version},".encode())
+    digest.update(b"more" if has_more else b"end")
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Sequence
+
+from sqlalchemy import ARRAY, Integer, any_, bindparam, column, delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api_v1.analytics.crud import EPOCH, lock_watermark, set_watermark
+from core.models import Order, OrderProductAssociation, ProductPairCount, RelatedProduct
+
+if TYPE_CHECKING:
+    import numpy as np
+
+RELATED_WATERMARK = "related_products"
+
+
+def co_occurrence(
+        order_ids: Sequence[int],
+        product_ids: Sequence[int],
+) -> tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """Count, for every ordered pair of distinct products, the orders containing both.
+
+    (order_id, product_id) rows become a sparse orders x products incidence
+    matrix B; B.T @ B is the products x products co-occurrence matrix.
+    Returns its off-diagonal non-zeros as (product_id, related_id, count).
+    """
+    try:
+        import numpy as np
+        from scipy import sparse
+    except ImportError as e:
+        raise RuntimeError(
+            "related products need numpy and scipy: poetry install --with recommendations"
+        ) from e
+
+    orders, order_index = np.unique(np.asarray(order_ids), return_inverse=True)
+    products, product_index = np.unique(np.asarray(product_ids), return_inverse=True)
+    incidence = sparse.csr_matrix(
+        (np.ones(len(order_index), dtype=np.int64), (order_index, product_index)),
+        shape=(len(orders), len(products)),
+    )
+    pairs = (incidence.T @ incidence).tocoo()
+    off_diagonal = pairs.row != pairs.col
+    return (
+        products[pairs.row[off_diagonal]],
+        products[pairs.col[off_diagonal]],
+        pairs.data[off_diagonal],
+    )
+
+
+async def refresh_related_products(
+        session: AsyncSession,
+        until: datetime,
+        top_k: int,
+        slice_length: timedelta,
+) -> tuple[datetime, datetime, int] | None:
+    """Fold one slice of orders after the watermark into the index.
+
+    The slice's pair counts are added to product_pair_counts with a single
+    unnest() upsert, then the top-K rows of every product they touched are
+    re-ranked into related_products. One transaction per slice, so memory
+    stays bounded and an interrupted run resumes from the watermark.
+    Returns (from, to, pairs) or None once caught up with ``until``.
+    """
+    watermark = await lock_watermark(session, RELATED_WATERMARK)
+    # skip empty stretches (e.g. the first run) straight to the next order
+    start = await session.scalar(
+        select(func.min(Order.created_at)).where(Order.created_at >= watermark, Order.created_at < until)
+    )
+    if start is None:
+        await set_watermark(session, RELATED_WATERMARK, max(watermark, until))
+        await session.commit()
+        return None
+    end = min(start + slice_length, until)
+
+    opa = OrderProductAssociation
+    result: Result = await session.execute(
+        select(opa.order_id, opa.product_id)
+        .where(opa.order_created_at >= start, opa.order_created_at < end)
+    )
+    rows = result.all()
+    pairs = 0
+    if rows:
+        order_ids, product_ids = zip(*rows)
+        left, right, counts = co_occurrence(order_ids, product_ids)
+        pairs = len(counts)
+    if pairs:
+        # three arrays as three bind parameters, whatever the slice size;
+        # AS deltas(product_id, related_id, count) names the columns unnest()
+        # returns (a multi-array unnest() takes no column types)
+        deltas = func.unnest(
+            bindparam("product_ids", left.tolist(), type_=ARRAY(Integer)),
+            bindparam("related_ids", right.tolist(), type_=ARRAY(Integer)),
+            bindparam("counts", counts.tolist(), type_=ARRAY(Integer)),
+        ).table_valued(
+            column("product_id", Integer),
+            column("related_id", Integer),
+            column("count", Integer),
+            name="deltas",
+        ).render_derived()
+        upsert = pg_insert(ProductPairCount).from_select(
+            ["product_id", "related_id", "count"],
+            select(deltas.c.product_id, deltas.c.related_id, deltas.c.count),
+        )
+        await session.execute(
+            upsert.on_conflict_do_update(
+                constraint="uq_product_pair_counts_pair",
+                set_={"count": ProductPairCount.count + upsert.excluded.count},
+            )
+        )
+
+        touched = any_(bindparam("touched", sorted(set(left.tolist())), type_=ARRAY(Integer)))
+        await session.execute(delete(RelatedProduct).where(RelatedProduct.product_id == touched))
+        rank = func.row_number().over(
+            partition_by=ProductPairCount.product_id,
+            order_by=(ProductPairCount.count.desc(), ProductPairCount.related_id),
+        ).label("rank")
+        ranked = (
+            select(ProductPairCount.product_id, ProductPairCount.related_id, ProductPairCount.count, rank)
+            .where(ProductPairCount.product_id == touched)
+            .subquery("ranked")
+        )
+        await session.execute(
+            insert(RelatedProduct).from_select(
+                ["product_id", "related_id", "count", "rank"],
+                select(ranked.c.product_id, ranked.c.related_id, ranked.c.count, ranked.c.rank)
+                .where(ranked.c.rank <= top_k),
+            )
+        )
+
+    await set_watermark(session, RELATED_WATERMARK, end)
+    await session.commit()
+    return start, end, pairs
+
+
+async def reset_related_products(session: AsyncSession) -> None:
+    # for a full rebuild, e.g. after lines were edited on already indexed orders
+    await lock_watermark(session, RELATED_WATERMARK)
+    await session.execute(delete(RelatedProduct))
+    await session.execute(delete(ProductPairCount))
+    await set_watermark(session, RELATED_WATERMARK, EPOCH)
+    await session.commit()
@@ -0,0 +1,48 @@
+from sqlalchemy import Select, and_, column, func, literal_column, or_, select, table
+
+from core.models import Product
+
+# Postgres: products.search_vector is a generated tsvector column with a GIN
+# index (migration 649ad188d462); it is not mapped on the model so that the
+# schema still builds on SQLite.
+SEARCH_CONFIG = "english"
+
+# SQLite (local development and tests): external-content FTS5 table kept in
+# sync with products by triggers, created along with the products table
+# (core/models/product.py).
+products_fts = table("products_fts", column("rowid"))
+
+
+def fts5_query(q: str) -> str:
+    # quote every term so user input can't break FTS5 query syntax
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def search_stmt(
+        dialect_name: str,
+        q: str,
+        limit: int,
+        after: tuple[float, int] | None = None,
+) -> Select:
+    """Ranked full-text match, best first, keyset-paginated on (rank, id)."""
+    if dialect_name == "sqlite":
+        fts = literal_column("products_fts")
+        # bm25() is lower-is-better, flip it so both backends sort descending
+        rank = -func.bm25(fts)
+        stmt = (
+            select(Product, rank.label("rank"))
+            .join_from(Product, products_fts, products_fts.c.rowid == Product.id)
+            .where(fts.op("MATCH")(fts5_query(q)))
+        )
+    else:
+        query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+        vector = literal_column("products.search_vector")
+        rank = func.ts_rank_cd(vector, query)
+        stmt = select(Product, rank.label("rank")).where(vector.op("@@")(query))
+
+    if after is not None:
+        after_rank, after_id = after
+        stmt = stmt.where(
+            or_(rank < after_rank, and_(rank == after_rank, Product.id > after_id))
+        )
+    return stmt.order_by(rank.desc(), Product.id).limit(limit + 1)
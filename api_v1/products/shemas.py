@@ -1,16 +1,27 @@
-from pydantic import BaseModel, ConfigDict
+from functools import lru_cache
+from typing import Annotated, Literal
+
+from annotated_types import Ge, MaxLen
+from typing_extensions import TypedDict
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
 
 
 class ProductBase(BaseModel):
     name: str
     description: str
     price: int
+    sku: Annotated[str, MaxLen(64)] | None = None
 
 
 class ProductCreate(ProductBase):
     pass
 
 
+class ProductBulkCreate(ProductCreate):
+    # the bulk upsert is keyed on sku: without one a re-sync would insert a duplicate
+    sku: Annotated[str, MaxLen(64)]
+
+
 class ProductUpdate(ProductCreate):
     pass
 
@@ -24,3 +35,94 @@ class ProductUpdatePartial(ProductCreate):
 class Product(ProductBase):
     model_config = ConfigDict(from_attributes=True)
     id: int
+    version: int
+
+
+class ProductStockUpdate(BaseModel):
+    quantity: Annotated[int, Ge(0)]
+
+
+class ProductStock(ProductStockUpdate):
+    product_id: int
+
+
+class ProductRow(TypedDict):
+    name: str
+    description: str
+    price: int
+    sku: str | None
+    id: int
+    version: int
+
+
+class ProductsPageRows(TypedDict):
+    items: list[ProductRow]
+    next_cursor: str | None
+
+
+# fast path: encodes already-typed DB rows straight to JSON bytes,
+# skipping model construction, validation and jsonable_encoder
+products_page_rows_adapter = TypeAdapter(ProductsPageRows)
+
+
+@lru_cache(maxsize=128)
+def sparse_product_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    # response schema limited to the requested ?fields=, built once per combination
+    return create_model(
+        f"Product[{','.join(fields)}]",
+        **{
+            name: (Product.model_fields[name].annotation, Product.model_fields[name])
+            for name in fields
+        },
+    )
+
+
+@lru_cache(maxsize=128)
+def sparse_products_page_model(fields: tuple[str, ...]) -> type[BaseModel]:
+    return create_model(
+        f"ProductsPage[{','.join(fields)}]",
+        items=(list[sparse_product_model(fields)], ...),
+        next_cursor=(str | None, None),
+    )
+
+
+class ProductFilter(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    name: str | None = None
+    min_price: int | None = None
+    max_price: int | None = None
+
+
+class ProductsPage(BaseModel):
+    items: list[Product]
+    next_cursor: str | None = None
+
+
+class ProductBulkItem(BaseModel):
+    index: int
+    status: Literal["created", "updated", "invalid"]
+    id: int | None = None
+    error: str | None = None
+
+
+class ProductBulkResult(BaseModel):
+    items: list[ProductBulkItem]
+    created: int
+    updated: int
+    invalid: int
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+class ProductSearchHit(Product):
+    rank: float
+
+
+class RelatedProductHit(Product):
+    # orders that contained both products
+    count: int
+
+
+class ProductSearchPage(BaseModel):
+    items: list[ProductSearchHit]
+    next_cursor: str | None = None
@@ -1,58 +1,289 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from typing import Annotated, AsyncIterator
+
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response, Header, Path
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from core.config import settings
+from core.idempotency import idempotency_key, idempotency_store
 from core.models import db_helper
-from . import crud
-from .dependencies import product_by_id
-from .shemas import ProductCreate, Product, ProductUpdate, ProductUpdatePartial
+from core.pagination import encode_cursor
+from . import crud, bulk
+from .etag import product_etag, page_etag, etag_matches, not_modified
+from .dependencies import (
+    cached_product_by_id,
+    product_filter,
+    product_fields,
+    after_product_id,
+    after_search_hit,
+    product_not_found,
+)
+from .shemas import (
+    ProductCreate,
+    Product,
+    ProductUpdate,
+    ProductUpdatePartial,
+    ProductFilter,
+    ProductsPage,
+    ProductBulkResult,
+    ProductSearchHit,
+    ProductSearchPage,
+    ProductStock,
+    ProductStockUpdate,
+    RelatedProductHit,
+    sparse_product_model,
+    sparse_products_page_model,
+    products_page_rows_adapter,
+)
 
 router = APIRouter(tags=["Products"])
 
+NOT_MODIFIED = {status.HTTP_304_NOT_MODIFIED: {"description": "Not Modified"}}
+
 
-@router.get("/", response_model=list[Product])
+@router.get("/", response_model=ProductsPage, responses=NOT_MODIFIED)
 async def get_products(
-        session: AsyncSession = Depends(db_helper.scoped_session_dependency),
+        response: Response,
+        limit: Annotated[int, Query(ge=1, le=500)] = 50,
+        after: int | None = Depends(after_product_id),
+        filters: ProductFilter = Depends(product_filter),
+        fields: tuple[str, ...] | None = Depends(product_fields),
+        if_none_match: Annotated[str | None, Header()] = None,
+        session: AsyncSession = Depends(db_helper.read_session_dependency),
+):
+    variant = ",".join(fields or ())
+    if if_none_match:
+        versions, has_more = await crud.get_product_versions(
+            session=session,
+            limit=limit,
+            after=after,
+            product_filter=filters,
+        )
+        etag = page_etag(versions, has_more, variant)
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    if fields or settings.products_fast_serialization:
+        rows, last_id = await crud.get_product_rows(
+            session=session,
+            fields=fields or tuple(Product.model_fields),
+            limit=limit,
+            after=after,
+            product_filter=filters,
+        )
+        next_cursor = encode_cursor({"id": last_id}) if last_id is not None else None
+        if fields:
+            content = sparse_products_page_model(fields)(items=rows, next_cursor=next_cursor).model_dump_json()
+        else:
+            content = products_page_rows_adapter.dump_json({"items": rows, "next_cursor": next_cursor})
+        etag = page_etag(((row["id"], row["version"]) for row in rows), last_id is not None, variant)
+        return Response(
+            content=content,
+            media_type="application/json",
+            headers={"ETag": etag},
+        )
+
+    products, last_id = await crud.get_products(
+        session=session,
+        limit=limit,
+        after=after,
+        product_filter=filters,
+    )
+    response.headers["ETag"] = page_etag(
+        ((product.id, product.version) for product in products),
+        last_id is not None,
+    )
+    return ProductsPage(
+        items=products,
+        next_cursor=encode_cursor({"id": last_id}) if last_id is not None else None,
+    )
+
+
+@router.get("/search/", response_model=ProductSearchPage)
+async def search_products(
+        q: Annotated[str, Query(min_length=1, max_length=200)],
+        limit: Annotated[int, Query(ge=1, le=100)] = 20,
+        after: tuple[float, int] | None = Depends(after_search_hit),
+        session: AsyncSession = Depends(db_helper.read_session_dependency),
 ):
-    return await crud.get_products(session=session)
+    hits, last = await crud.search_products(session=session, q=q, limit=limit, after=after)
+    return ProductSearchPage(
+        items=[
+            ProductSearchHit(**Product.model_validate(product).model_dump(), rank=rank)
+            for product, rank in hits
+        ],
+        next_cursor=encode_cursor({"rank": last[0], "id": last[1]}) if last is not None else None,
+    )
+
+
+async def products_ndjson(batch_size: int, filters: ProductFilter) -> AsyncIterator[str]:
+    # the stream outlives the request dependencies, so it owns its session
+    async with db_helper.read_session_factory()() as session:
+        async for rows in crud.stream_products(
+                session=session,
+                batch_size=batch_size,
+                product_filter=filters,
+        ):
+            yield "".join(
+                Product.model_validate(row).model_dump_json() + "\n"
+                for row in rows
+            )
+
+
+@router.get("/export/", response_class=StreamingResponse)
+async def export_products(
+        batch_size: Annotated[int, Query(ge=1, le=10_000)] = 1000,
+        filters: ProductFilter = Depends(product_filter),
+):
+    return StreamingResponse(
+        products_ndjson(batch_size=batch_size, filters=filters),
+        media_type="application/x-ndjson",
+    )
 
 
 @router.post("/", response_model=Product, status_code=status.HTTP_201_CREATED)
 async def create_product(
         product_in: ProductCreate,
-        session: AsyncSession = Depends(db_helper.scoped_session_dependency),
+        key: str | None = Depends(idempotency_key),
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
 ):
-    return await crud.create_product(session=session, product_in=product_in)
+    if key is None:
+        return await crud.create_product(session=session, product_in=product_in)
+    return await idempotency_store.respond(
+        session=session,
+        scope="products:create",
+        key=key,
+        payload=product_in,
+        fn=lambda: crud.create_product(session=session, product_in=product_in, commit=False),
+        response_model=Product,
+        status_code=status.HTTP_201_CREATED,
+    )
+
 
+@router.post("/bulk/", response_model=ProductBulkResult)
+async def bulk_upsert_products(
+        request: Request,
+        chunk_size: Annotated[int, Query(ge=1, le=5000)] = 1000,
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
+):
+    # accepts a JSON array or an application/x-ndjson stream of ProductBulkCreate
+    # (rows without a sku are reported invalid); each chunk is one multi-row
+    # upsert keyed on sku and one commit
+    return await bulk.upsert_from_request(
+        session=session,
+        request=request,
+        chunk_size=chunk_size,
+    )
 
-@router.get("/{product_id}/", response_model=Product)
+
+@router.get("/{product_id}/", response_model=Product, responses=NOT_MODIFIED)
 async def get_product(
-    product: Product = Depends(product_by_id),
+        product_id: Annotated[int, Path],
+        response: Response,
+        fields: tuple[str, ...] | None = Depends(product_fields),
+        if_none_match: Annotated[str | None, Header()] = None,
+        session: AsyncSession = Depends(db_helper.read_session_dependency),
 ):
+    variant = ",".join(fields or ())
+    if if_none_match:
+        version = await crud.get_product_version(session=session, product_id=product_id)
+        if version is not None:
+            etag = product_etag(product_id, version, variant)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+
+    if fields:
+        row = await crud.get_product_row(session=session, product_id=product_id, fields=fields)
+        if row is None:
+            raise product_not_found(product_id)
+        return Response(
+            content=sparse_product_model(fields)(**row).model_dump_json(),
+            media_type="application/json",
+            headers={"ETag": product_etag(product_id, row["version"], variant)},
+        )
+
+    product = await cached_product_by_id(product_id=product_id, session=session)
+    response.headers["ETag"] = product_etag(product.id, product.version)
     return product
 
 
-@router.put("/{product_id}/")
+@router.put("/{product_id}/", response_model=Product)
 async def update_product(
+        product_id: Annotated[int, Path],
         product_update: ProductUpdate,
-        product: Product = Depends(product_by_id),
-        session: AsyncSession = Depends(db_helper.scoped_session_dependency),
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
 ):
-    return await crud.update_product(session=session, product=product, product_update=product_update)
+    product = await crud.update_product(session=session, product_id=product_id, product_update=product_update)
+    if product is None:
+        raise product_not_found(product_id)
+    return product
 
 
-@router.patch("/{product_id}/")
+@router.patch("/{product_id}/", response_model=Product)
 async def update_product_partial(
+        product_id: Annotated[int, Path],
         product_update: ProductUpdatePartial,
-        product: Product = Depends(product_by_id),
-        session: AsyncSession = Depends(db_helper.scoped_session_dependency),
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
 ):
-    return await crud.update_product(session=session, product=product, product_update=product_update, partial=True)
+    product = await crud.update_product(
+        session=session,
+        product_id=product_id,
+        product_update=product_update,
+        partial=True,
+    )
+    if product is None:
+        raise product_not_found(product_id)
+    return product
 
 
-@router.delete("/{product_id/", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{product_id}/", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_product(
-        product: Product = Depends(product_by_id),
-        session: AsyncSession = Depends(db_helper.scoped_session_dependency),
+        product_id: Annotated[int, Path],
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
 ) -> None:
-    await crud.delete_product(session=session, product=product)
+    if not await crud.delete_product(session=session, product_id=product_id):
+        raise product_not_found(product_id)
+
 
+@router.get("/{product_id}/related/", response_model=list[RelatedProductHit])
+async def get_related_products(
+        product_id: Annotated[int, Path],
+        limit: Annotated[int, Query(ge=1, le=50)] = 10,
+        session: AsyncSession = Depends(db_helper.read_session_dependency),
+):
+    related = await crud.get_related_products(session=session, product_id=product_id, limit=limit)
+    if not related:
+        # tell an unknown product from one nobody bought with anything yet
+        await cached_product_by_id(product_id=product_id, session=session)
+    return [
+        RelatedProductHit(**Product.model_validate(product).model_dump(), count=count)
+        for product, count in related
+    ]
+
+
+@router.get("/{product_id}/stock/", response_model=ProductStock)
+async def get_product_stock(
+        product_id: Annotated[int, Path],
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
+):
+    stock = await crud.get_stock(session=session, product_id=product_id)
+    if stock is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Stock is not tracked for product {product_id}",
+        )
+    return stock
+
+
+@router.put("/{product_id}/stock/", response_model=ProductStock)
+async def set_product_stock(
+        product_id: Annotated[int, Path],
+        stock_in: ProductStockUpdate,
+        session: AsyncSession = Depends(db_helper.request_session_dependency),
+):
+    try:
+        return await crud.set_stock(session=session, product_id=product_id, quantity=stock_in.quantity)
+    except IntegrityError:
+        await session.rollback()
+        raise product_not_found(product_id)
@@ -0,0 +1,81 @@
+"""Compare one-at-a-time product creation with the chunked bulk upsert.
+
+    python -m benchmarks.bulk_products --rows 50000 --chunk-size 1000
+"""
+import argparse
+import asyncio
+import uuid
+from time import perf_counter
+
+from sqlalchemy import delete
+
+from api_v1.products import crud
+from api_v1.products.shemas import ProductBulkCreate, ProductCreate
+from core.models import db_helper, Product
+
+
+def make_products(rows: int, prefix: str) -> list[ProductBulkCreate]:
+    return [
+        ProductBulkCreate(
+            name=f"Bench product {i}",
+            description="Generated by benchmarks.bulk_products",
+            price=100 + i % 900,
+            sku=f"{prefix}-{i}",
+        )
+        for i in range(rows)
+    ]
+
+
+async def one_at_a_time(products: list[ProductCreate]) -> float:
+    started = perf_counter()
+    async with db_helper.session_factory() as session:
+        for product_in in products:
+            await crud.create_product(session=session, product_in=product_in)
+    return perf_counter() - started
+
+
+async def bulk_upsert(products: list[ProductBulkCreate], chunk_size: int) -> float:
+    started = perf_counter()
+    async with db_helper.session_factory() as session:
+        for start in range(0, len(products), chunk_size):
+            await crud.upsert_products(
+                session=session,
+                products_in=products[start:start + chunk_size],
+            )
+    return perf_counter() - started
+
+
+async def cleanup(prefix: str) -> None:
+    async with db_helper.session_factory() as session:
+        await session.execute(delete(Product).where(Product.sku.startswith(f"{prefix}-")))
+        await session.commit()
+
+
+def report(label: str, rows: int, elapsed: float) -> None:
+    print(f"{label:<16} {rows:>8} rows {elapsed:>9.3f}s {rows / elapsed:>12.1f} rows/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    try:
+        elapsed = await one_at_a_time(make_products(args.rows, f"{prefix}-single"))
+        report("one-at-a-time", args.rows, elapsed)
+
+        elapsed = await bulk_upsert(make_products(args.rows, f"{prefix}-bulk"), args.chunk_size)
+        report("bulk insert", args.rows, elapsed)
+
+        # same skus again: every row now takes the ON CONFLICT DO UPDATE path
+        elapsed = await bulk_upsert(make_products(args.rows, f"{prefix}-bulk"), args.chunk_size)
+        report("bulk update", args.rows, elapsed)
+    finally:
+        await cleanup(prefix)
+        await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
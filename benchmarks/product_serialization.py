@@ -0,0 +1,77 @@
+"""Compare the default product list serialization with the fast path.
+
+    python -m benchmarks.product_serialization --sizes 1000 10000 100000
+
+default: ORM objects -> ProductsPage -> FastAPI response_model validation
+         -> jsonable JSON -> JSONResponse
+fast:    row mappings -> products_page_rows_adapter.dump_json -> bytes
+
+No database is involved; only the serialization cost is measured.
+"""
+import argparse
+import asyncio
+from time import perf_counter
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from api_v1.products.shemas import ProductsPage, Product as ProductSchema, products_page_rows_adapter
+from core.models import Product
+
+response_field = create_response_field(name="Response_get_products", type_=ProductsPage)
+
+
+def make_rows(size: int) -> list[dict]:
+    return [
+        {
+            "name": f"Product {i}",
+            "description": "Great product " * 8,
+            "price": 100 + i % 900,
+            "sku": f"SKU-{i}",
+            "id": i,
+            "version": 1,
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+async def default_path(products: list[Product]) -> bytes:
+    page = ProductsPage(items=products, next_cursor=None)
+    content = await serialize_response(field=response_field, response_content=page, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+async def fast_path(rows: list[dict]) -> bytes:
+    return products_page_rows_adapter.dump_json({"items": rows, "next_cursor": None})
+
+
+async def timed(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = perf_counter()
+        await fn(arg)
+        best = min(best, perf_counter() - started)
+    return best
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'default':>12} {'fast':>12} {'speedup':>8}")
+    for size in args.sizes:
+        rows = make_rows(size)
+        products = [Product(**row) for row in rows]
+        assert ProductsPage.model_validate_json(await fast_path(rows)) == \
+            ProductsPage(items=[ProductSchema(**row) for row in rows])
+
+        default = await timed(default_path, products, args.repeat)
+        fast = await timed(fast_path, rows, args.repeat)
+        print(f"{size:>8} {default * 1000:>10.1f}ms {fast * 1000:>10.1f}ms {default / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,180 @@
+"""Per-request session overhead of the products router (Postgres).
+
+    python -m benchmarks.request_sessions --requests 5000 --concurrency 50
+
+Drives the app in process through a bare ASGI call (no server, no HTTP
+client), once with the old per-request async_scoped_session dependency and
+once with the lazy sessions of RequestSessionMiddleware. The request mix has
+list pages and stock lookups (one query each), product reads the cache
+mostly answers, and requests that fail validation before any query runs.
+Reports latency, pool checkouts per request, how long each checkout held
+its connection and the peak number of connections checked out at once.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import uuid
+from time import perf_counter
+
+from sqlalchemy import delete, event, insert, select
+
+from api_v1.products.cache import product_cache
+from core.models import db_helper, Product
+from main import app
+
+
+async def seed(rows: int, prefix: str) -> list[int]:
+    async with db_helper.session_factory() as session:
+        await session.execute(
+            insert(Product),
+            [
+                {"name": f"Product {i}", "description": "benchmarks.request_sessions", "price": 100 + i, "sku": f"{prefix}-{i}"}
+                for i in range(rows)
+            ],
+        )
+        await session.commit()
+        return list(await session.scalars(select(Product.id).where(Product.sku.startswith(f"{prefix}-"))))
+
+
+def request_paths(product_ids: list[int], requests: int) -> list[str]:
+    paths = []
+    for _ in range(requests):
+        product_id = random.choice(product_ids)
+        paths.append(random.choices(
+            (
+                "/api/v1/products/?limit=20",
+                f"/api/v1/products/{product_id}/",
+                f"/api/v1/products/{product_id}/stock/",
+                "/api/v1/products/not-a-number/",
+                "/api/v1/products/?limit=0",
+            ),
+            weights=(3, 4, 2, 1, 1),
+        )[0])
+    return paths
+
+
+async def call(path: str) -> int:
+    # the smallest ASGI round trip: GET path, collect the status, drop the body
+    route, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": route,
+        "raw_path": route.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    status = 0
+    request_sent = False
+    response_done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # middleware listens for the client going away until the response is done
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    await app(scope, receive, send)
+    return status
+
+
+async def run(paths: list[str], concurrency: int) -> dict[str, float]:
+    pool = db_helper.engine.pool
+    checked_out_at = {}
+    holds = []
+    peak = 0
+
+    def on_checkout(dbapi_connection, record, proxy):
+        nonlocal peak
+        checked_out_at[id(record)] = perf_counter()
+        peak = max(peak, pool.checkedout())
+
+    def on_checkin(dbapi_connection, record):
+        started = checked_out_at.pop(id(record), None)
+        if started is not None:
+            holds.append(perf_counter() - started)
+
+    event.listen(pool, "checkout", on_checkout)
+    event.listen(pool, "checkin", on_checkin)
+    product_cache.clear()
+    checkouts = pool.checkouts
+    queue = iter(paths)
+    timings = []
+
+    async def client():
+        for path in queue:
+            started = perf_counter()
+            await call(path)
+            timings.append(perf_counter() - started)
+
+    started = perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = perf_counter() - started
+    event.remove(pool, "checkout", on_checkout)
+    event.remove(pool, "checkin", on_checkin)
+
+    ms = sorted(t * 1000 for t in timings)
+    return {
+        "req/s": len(paths) / elapsed,
+        "p50 ms": statistics.median(ms),
+        "p95 ms": ms[int(len(ms) * 0.95) - 1],
+        "checkouts/req": (pool.checkouts - checkouts) / len(paths),
+        "hold ms": statistics.mean(holds) * 1000 if holds else 0.0,
+        "peak conns": peak,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    try:
+        product_ids = await seed(args.rows, prefix)
+        paths = request_paths(product_ids, args.requests)
+        # warm up imports, the pool and the statement caches
+        await run(paths[:200], args.concurrency)
+
+        scoped = {
+            db_helper.request_session_dependency: db_helper.scoped_session_dependency,
+            db_helper.read_session_dependency: db_helper.scoped_session_dependency,
+        }
+        results = {}
+        for name, overrides in (("scoped", scoped), ("lazy", {})):
+            app.dependency_overrides = overrides
+            results[name] = await run(paths, args.concurrency)
+        app.dependency_overrides = {}
+
+        print(f"{args.requests} requests, concurrency {args.concurrency}")
+        print(f"{'':>16}" + "".join(f"{name:>12}" for name in results))
+        for metric in results["lazy"]:
+            print(f"{metric:>16}" + "".join(f"{result[metric]:>12.2f}" for result in results.values()))
+    finally:
+        async with db_helper.session_factory() as session:
+            await session.execute(delete(Product).where(Product.sku.startswith(f"{prefix}-")))
+            await session.commit()
+        await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
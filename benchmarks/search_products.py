@@ -0,0 +1,88 @@
+"""Measure full-text search latency over a large generated catalog (Postgres).
+
+    python -m benchmarks.search_products --rows 1000000 --queries 200
+
+Rows are generated server-side with generate_series and tagged with a sku
+prefix so they can be removed afterwards (unless --keep is given).
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import uuid
+from time import perf_counter
+
+from sqlalchemy import delete, text
+
+from api_v1.products import crud
+from core.models import db_helper, Product
+
+WORDS = (
+    "mouse", "keyboard", "display", "gaming", "office", "wireless", "ergonomic",
+    "mechanical", "monitor", "headset", "laptop", "stand", "cable", "charger",
+    "speaker", "webcam", "microphone", "dock", "adapter", "controller",
+)
+
+SEED_SQL = text(
+    """
+    INSERT INTO products (name, description, price, sku)
+    SELECT
+        initcap(w[1 + (i * 7) % cardinality(w)]) || ' ' || w[1 + (i * 13) % cardinality(w)],
+        w[1 + (i * 3) % cardinality(w)] || ' ' || w[1 + (i * 11) % cardinality(w)] || ' '
+            || w[1 + (i * 17) % cardinality(w)] || ' with ' || w[1 + (i * 19) % cardinality(w)],
+        100 + i % 900,
+        :prefix || '-' || i
+    FROM generate_series(1, :rows) AS i, (SELECT CAST(:words AS text[]) AS w) AS words
+    """
+)
+
+
+async def seed(rows: int, prefix: str) -> float:
+    started = perf_counter()
+    async with db_helper.session_factory() as session:
+        await session.execute(SEED_SQL, {"rows": rows, "prefix": prefix, "words": list(WORDS)})
+        await session.commit()
+        await session.execute(text("ANALYZE products"))
+    return perf_counter() - started
+
+
+async def measure(queries: int, limit: int) -> list[float]:
+    timings = []
+    async with db_helper.session_factory() as session:
+        for _ in range(queries):
+            q = " ".join(random.sample(WORDS, k=random.randint(1, 2)))
+            started = perf_counter()
+            await crud.search_products(session=session, q=q, limit=limit)
+            timings.append(perf_counter() - started)
+    return timings
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    try:
+        print(f"seeded {args.rows} rows in {await seed(args.rows, prefix):.1f}s")
+        timings = sorted(await measure(args.queries, args.limit))
+        ms = [t * 1000 for t in timings]
+        print(
+            f"{args.queries} queries, limit {args.limit}: "
+            f"p50 {statistics.median(ms):.2f}ms "
+            f"p95 {ms[int(len(ms) * 0.95) - 1]:.2f}ms "
+            f"max {ms[-1]:.2f}ms"
+        )
+    finally:
+        if not args.keep:
+            async with db_helper.session_factory() as session:
+                await session.execute(delete(Product).where(Product.sku.startswith(f"{prefix}-")))
+                await session.commit()
+        await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""Many concurrent buyers placing orders for the same hot SKU (Postgres).
+
+    python -m benchmarks.stock_contention --clients 200 --stock 150
+
+Every client places single-item orders through crud.create_order until the
+stock runs out. Reports order throughput and checks that nothing oversold:
+accepted orders + remaining stock must equal the initial stock.
+"""
+import argparse
+import asyncio
+import statistics
+import uuid
+from time import perf_counter
+
+from sqlalchemy import delete, select
+
+from api_v1.orders import crud
+from api_v1.orders.schemas import OrderCreate
+from core.models import db_helper, Order, OrderProductAssociation, Product, Stock
+
+
+async def seed(stock: int, prefix: str) -> int:
+    async with db_helper.session_factory() as session:
+        product = Product(name="Hot drop", description="benchmarks.stock_contention", price=100, sku=prefix)
+        session.add(product)
+        await session.flush()
+        session.add(Stock(product_id=product.id, quantity=stock))
+        await session.commit()
+        return product.id
+
+
+async def buyer(product_id: int, latencies: list[float], order_ids: list[int]) -> None:
+    order_in = OrderCreate(items=[{"product_id": product_id, "count": 1}])
+    async with db_helper.session_factory() as session:
+        while True:
+            started = perf_counter()
+            try:
+                order = await crud.create_order(session=session, order_in=order_in)
+            except crud.InsufficientStock:
+                return
+            latencies.append(perf_counter() - started)
+            order_ids.append(order.id)
+
+
+async def cleanup(product_id: int, order_ids: list[int]) -> None:
+    async with db_helper.session_factory() as session:
+        await session.execute(
+            delete(OrderProductAssociation).where(OrderProductAssociation.order_id.in_(order_ids))
+        )
+        await session.execute(delete(Order).where(Order.id.in_(order_ids)))
+        await session.execute(delete(Product).where(Product.id == product_id))
+        await session.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--stock", type=int, default=1000)
+    args = parser.parse_args()
+
+    product_id = await seed(args.stock, f"bench-{uuid.uuid4().hex[:8]}")
+    latencies: list[float] = []
+    order_ids: list[int] = []
+    try:
+        started = perf_counter()
+        await asyncio.gather(*(buyer(product_id, latencies, order_ids) for _ in range(args.clients)))
+        elapsed = perf_counter() - started
+
+        async with db_helper.session_factory() as session:
+            remaining = await session.scalar(select(Stock.quantity).where(Stock.product_id == product_id))
+        accepted = len(order_ids)
+        latencies.sort()
+        print(f"clients           {args.clients:>10}")
+        print(f"accepted orders   {accepted:>10} ({accepted / elapsed:.1f} orders/s)")
+        print(f"remaining stock   {remaining:>10}")
+        print(f"latency p50       {statistics.median(latencies) * 1000:>10.2f} ms")
+        print(f"latency p99       {latencies[int(len(latencies) * 0.99) - 1] * 1000:>10.2f} ms")
+        print("oversold" if accepted + remaining != args.stock or remaining < 0 else "no oversell")
+    finally:
+        await cleanup(product_id, order_ids)
+        await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
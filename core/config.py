@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -13,15 +14,103 @@ class AuthJWT(BaseModel):
     access_token_expire_minutes: int = 3
 
 
+class DbPool(BaseModel):
+    size: int = 5
+    max_overflow: int = 10
+    timeout_seconds: float = 30.0
+    # close connections older than this; -1 keeps them forever
+    recycle_seconds: int = 30 * 60
+    pre_ping: bool = False
+    # asyncpg prepared statements cached per connection; 0 disables
+    # (required behind pgbouncer in transaction mode); other drivers ignore it
+    statement_cache_size: int = 100
+
+
+class DbReplicas(BaseModel):
+    # full SQLAlchemy URLs; lag is measured on Postgres standbys, any other
+    # database (or a Postgres primary) reports none
+    urls: list[str] = []
+    balancing: Literal["round_robin", "least_loaded"] = "least_loaded"
+    max_lag_seconds: float = 5.0
+    health_check_interval_seconds: float = 5.0
+    health_check_timeout_seconds: float = 2.0
+    # after a successful write, the client reads from the primary this long
+    sticky_seconds: int = 5
+
+
+class SqlInstrumentation(BaseModel):
+    # per-request query count and DB time: Server-Timing header and log fields
+    enabled: bool = True
+    server_timing: bool = True
+    # warn when one statement shape runs more often than this in a request
+    n_plus_one_threshold: int | None = None
+
+
+class QueryCache(BaseModel):
+    # second-level cache for reads opted in with execution_options(query_cache=True)
+    enabled: bool = True
+    max_size: int = 10_000
+    ttl_seconds: float = 30.0
+
+
+class ProductCache(BaseModel):
+    max_size: int = 10_000
+    ttl_seconds: float = 30.0
+
+
+class Idempotency(BaseModel):
+    ttl_seconds: float = 24 * 60 * 60
+    # delete expired keys from the app (or run python -m jobs.idempotency_keys)
+    purge: bool = True
+    purge_interval_seconds: float = 60 * 60
+
+
+class OrderPartitions(BaseModel):
+    maintain: bool = True
+    months_ahead: int = 3
+    interval_seconds: float = 6 * 60 * 60
+
+
+class OrderArchive(BaseModel):
+    after_days: int = 365
+    batch_size: int = 1000
+    pause_seconds: float = 0.2
+
+
+class SalesRollups(BaseModel):
+    refresh: bool = True
+    interval_seconds: float = 60.0
+    # orders younger than this may still be uncommitted; refresh up to here
+    lag_seconds: float = 30.0
+
+
+class RelatedProducts(BaseModel):
+    top_k: int = 20
+    # orders younger than this may still get lines added
+    lag_seconds: float = 60 * 60
+    slice_hours: float = 24.0
+
+
 class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
     DB_USER: str
     DB_PASS: str
     DB_NAME: str
-    db_echo: bool = True
+    db_echo: bool = False
+    db_pool: DbPool = DbPool()
+    db_replicas: DbReplicas = DbReplicas()
+    sql_instrumentation: SqlInstrumentation = SqlInstrumentation()
+    query_cache: QueryCache = QueryCache()
     api_v1_prefix: str = "/api/v1"
     auth_jwt: AuthJWT = AuthJWT()
+    product_cache: ProductCache = ProductCache()
+    products_fast_serialization: bool = False
+    idempotency: Idempotency = Idempotency()
+    order_partitions: OrderPartitions = OrderPartitions()
+    order_archive: OrderArchive = OrderArchive()
+    sales_rollups: SalesRollups = SalesRollups()
+    related_products: RelatedProducts = RelatedProducts()
 
     @property
     def db_url(self):
@@ -0,0 +1,70 @@
+from bisect import bisect_left
+from time import perf_counter
+
+from pydantic import BaseModel
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# upper bounds of the checkout wait histogram buckets, in milliseconds
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolStats(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_ms_total: float
+    wait_ms_max: float
+    # cumulative, Prometheus style: "le_<bound>" -> checkouts that waited <= bound
+    wait_ms_histogram: dict[str, int]
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that records how long checkouts wait for a connection.
+
+    The wait covers queueing for a free connection and, when the pool grows
+    into its overflow, opening a new one.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        waited = (perf_counter() - started) * 1000
+        self.checkouts += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.wait_counts[bisect_left(WAIT_BUCKETS_MS, waited)] += 1
+        return connection
+
+    def stats(self) -> PoolStats:
+        histogram = {}
+        cumulative = 0
+        for bound, count in zip(WAIT_BUCKETS_MS + ("inf",), self.wait_counts):
+            cumulative += count
+            histogram[f"le_{bound}"] = cumulative
+        return PoolStats(
+            size=self.size(),
+            checked_in=self.checkedin(),
+            checked_out=self.checkedout(),
+            overflow=max(self.overflow(), 0),
+            checkouts=self.checkouts,
+            timeouts=self.timeouts,
+            wait_ms_total=round(self.wait_total, 3),
+            wait_ms_max=round(self.wait_max, 3),
+            wait_ms_histogram=histogram,
+        )
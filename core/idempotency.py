@@ -0,0 +1,110 @@
+import hashlib
+from datetime import timedelta
+from typing import Annotated, Any, Awaitable, Callable
+
+from fastapi import Header, HTTPException, Response, status
+from pydantic import BaseModel
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.models import IdempotencyKey
+
+REPLAYED_HEADER = "Idempotency-Replayed"
+
+
+class IdempotencyStore:
+    """Remembers the first successful response per Idempotency-Key in the database.
+
+    The key is claimed with INSERT ... ON CONFLICT DO NOTHING, and the claim,
+    the write and the stored response commit in one transaction or not at
+    all. Failed attempts leave nothing behind and may be retried with the
+    same key. A duplicate arriving while the first request is running
+    blocks on the claim until that request commits, then gets its response.
+    Replays are answered from the stored status and body without running
+    the handler again, by any worker.
+    Entries expire after ``ttl`` seconds; ``purge`` deletes them.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = timedelta(seconds=ttl)
+
+    async def respond(
+            self,
+            session: AsyncSession,
+            scope: str,
+            key: str,
+            payload: BaseModel,
+            fn: Callable[[], Awaitable[Any]],
+            response_model: type[BaseModel],
+            status_code: int = status.HTTP_200_OK,
+    ) -> Response:
+        """Run ``fn`` once per key; ``fn`` must write through ``session`` without committing."""
+        fingerprint = hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+        claim = (
+            insert(IdempotencyKey)
+            .values(scope=scope, key=key, fingerprint=fingerprint)
+            .on_conflict_do_nothing(constraint="uq_idempotency_keys_scope_key")
+            .returning(IdempotencyKey.id)
+        )
+        while (claimed := await session.scalar(claim)) is None:
+            stored = await session.scalar(
+                select(IdempotencyKey).where(
+                    IdempotencyKey.scope == scope,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at >= func.now() - self.ttl,
+                )
+            )
+            if stored is not None:
+                return self.replay(stored, fingerprint)
+            # expired but not purged yet: take the key over
+            await session.execute(
+                delete(IdempotencyKey).where(
+                    IdempotencyKey.scope == scope,
+                    IdempotencyKey.key == key,
+                    IdempotencyKey.created_at < func.now() - self.ttl,
+                )
+            )
+
+        body = response_model.model_validate(await fn()).model_dump_json()
+        await session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.id == claimed)
+            .values(status_code=status_code, body=body)
+        )
+        await session.commit()
+        return Response(content=body, status_code=status_code, media_type="application/json")
+
+    @staticmethod
+    def replay(stored: IdempotencyKey, fingerprint: str) -> Response:
+        if stored.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different payload",
+            )
+        return Response(
+            content=stored.body,
+            status_code=stored.status_code,
+            media_type="application/json",
+            headers={REPLAYED_HEADER: "true"},
+        )
+
+    async def purge(self, session: AsyncSession) -> int:
+        result = await session.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.created_at < func.now() - self.ttl)
+        )
+        await session.commit()
+        return result.rowcount
+
+
+def idempotency_key(
+        idempotency_key: Annotated[
+            str | None,
+            Header(max_length=255, description="Retries with the same key replay the first response"),
+        ] = None,
+) -> str | None:
+    return idempotency_key
+
+
+idempotency_store = IdempotencyStore(ttl=settings.idempotency.ttl_seconds)
@@ -1,5 +1,6 @@
 __all__ = (
     "Base",
+    "utc_now",
     "DatabaseHelper",
     "db_helper",
     "Product",
@@ -7,10 +8,19 @@ __all__ = (
     "Post",
     "Profile",
     "Order",
-    "OrderProductAssociation"
+    "OrderProductAssociation",
+    "Stock",
+    "ArchivedOrder",
+    "ArchivedOrderLine",
+    "HourlySales",
+    "DailySales",
+    "RollupWatermark",
+    "ProductPairCount",
+    "RelatedProduct",
+    "IdempotencyKey",
 )
 
-from .base import Base
+from .base import Base, utc_now
 from .db_helper import DatabaseHelper, db_helper
 from .product import Product
 from .user import User
@@ -18,3 +28,8 @@ from .post import Post
 from .profile import Profile
 from .order import Order
 from .order_product_association import OrderProductAssociation
+from .stock import Stock
+from .order_archive import ArchivedOrder, ArchivedOrderLine
+from .sales_rollup import HourlySales, DailySales, RollupWatermark
+from .related_product import ProductPairCount, RelatedProduct
+from .idempotency_key import IdempotencyKey
@@ -1,4 +1,14 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, func
 from sqlalchemy.orm import DeclarativeBase, mapped_column, Mapped, declared_attr
+from sqlalchemy.sql.functions import Function
+
+
+def utc_now() -> Function[datetime]:
+    # the transaction's start time as naive UTC, which is what the timestamp
+    # (without time zone) columns hold whatever the server's TimeZone is
+    return func.timezone("utc", func.now(), type_=DateTime)
 
 
 class Base(DeclarativeBase):
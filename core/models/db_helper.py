@@ -1,23 +1,191 @@
+import asyncio
+import logging
 from asyncio import current_task
+from itertools import count
 
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, async_scoped_session, AsyncSession
+from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    create_async_engine,
+    async_sessionmaker,
+    async_scoped_session,
+    AsyncEngine,
+    AsyncSession,
+)
 
-from core.config import settings
+from core.config import DbPool, DbReplicas, settings
+from core.db_pool import InstrumentedPool, PoolStats
+from core.query_cache import NO_STORE, query_cache
+from core.query_stats import instrument
 
+log = logging.getLogger(__name__)
 
-class DatabaseHelper:
-    def __init__(self, url: str, echo: bool = False):
-        self.engine = create_async_engine(
-            url=url,
-            echo=True
-        )
-        self.session_factory = async_sessionmaker(
-            bind=self.engine,
-            autoflush=False,
-            autocommit=False,
-            expire_on_commit=False
+# set on responses to successful writes; while present, reads go to the primary
+READ_PRIMARY_COOKIE = "read_primary"
+# where RequestSessionMiddleware keeps the request's sessions in scope["state"]
+REQUEST_SESSIONS = "db_sessions"
+# session.info flags: the session reads a replica / must see the client's own writes
+REPLICA_SESSION = "replica"
+READ_OWN_WRITES = "read_own_writes"
+
+# seconds the standby is behind; 0 on a primary or a fully replayed standby
+# (an idle primary would otherwise look like a growing lag)
+REPLICATION_LAG = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+)
+# other databases have no standby to ask: the probe only checks they answer
+NO_LAG = text("SELECT 0")
+
+
+class ReplicaStatus(BaseModel):
+    url: str
+    healthy: bool
+    lag_seconds: float | None
+    error: str | None
+    pool: PoolStats
+
+
+def create_engine(url: str, echo: bool, pool: DbPool) -> AsyncEngine:
+    # statement_cache_size is an asyncpg connect() argument; other drivers reject it
+    connect_args = {}
+    if make_url(url).get_dialect().driver == "asyncpg":
+        connect_args["statement_cache_size"] = pool.statement_cache_size
+    engine = create_async_engine(
+        url=url,
+        echo=echo,
+        poolclass=InstrumentedPool,
+        pool_size=pool.size,
+        max_overflow=pool.max_overflow,
+        pool_timeout=pool.timeout_seconds,
+        pool_recycle=pool.recycle_seconds,
+        pool_pre_ping=pool.pre_ping,
+        connect_args=connect_args,
+    )
+    instrument(engine)
+    return engine
+
+
+def create_session_factory(engine: AsyncEngine, replica: bool = False) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=engine,
+        autoflush=False,
+        autocommit=False,
+        expire_on_commit=False,
+        # replica reads may lag: they must not fill caches the primary reads share
+        info={REPLICA_SESSION: True, NO_STORE: True} if replica else None,
+    )
+
+
+def is_replica_session(session: AsyncSession) -> bool:
+    return session.info.get(REPLICA_SESSION, False)
+
+
+def reads_own_writes(session: AsyncSession) -> bool:
+    # set for clients holding READ_PRIMARY_COOKIE: no cached or shared reads
+    return session.info.get(READ_OWN_WRITES, False)
+
+
+class Replica:
+    def __init__(self, url: str, echo: bool, pool: DbPool):
+        self.url = url
+        self.engine = create_engine(url, echo, pool)
+        self.session_factory = create_session_factory(self.engine, replica=True)
+        self.lag_probe = REPLICATION_LAG if self.engine.dialect.name == "postgresql" else NO_LAG
+        # trusted until the first health check says otherwise
+        self.healthy = True
+        self.lag: float | None = 0.0
+        self.error: str | None = None
+
+    async def check(self, timeout: float) -> None:
+        try:
+            async with asyncio.timeout(timeout):
+                async with self.engine.connect() as conn:
+                    lag = float(await conn.scalar(self.lag_probe))
+        except Exception as e:
+            if self.healthy:
+                log.warning("replica %s is down: %r", self.status_url(), e)
+            self.healthy, self.lag, self.error = False, None, repr(e)
+            return
+        if not self.healthy:
+            log.warning("replica %s is back", self.status_url())
+        self.healthy, self.lag, self.error = True, lag, None
+
+    def status_url(self) -> str:
+        return make_url(self.url).render_as_string(hide_password=True)
+
+    def status(self) -> ReplicaStatus:
+        return ReplicaStatus(
+            url=self.status_url(),
+            healthy=self.healthy,
+            lag_seconds=self.lag,
+            error=self.error,
+            pool=self.engine.pool.stats(),
         )
 
+
+class DatabaseHelper:
+    def __init__(
+            self,
+            url: str,
+            echo: bool = False,
+            pool: DbPool | None = None,
+            replicas: DbReplicas | None = None,
+    ):
+        pool = pool or DbPool()
+        replicas = replicas or DbReplicas()
+        self.engine = create_engine(url, echo, pool)
+        self.session_factory = create_session_factory(self.engine)
+        self.replica_config = replicas
+        self.replicas = [Replica(replica_url, echo, pool) for replica_url in replicas.urls]
+        self._turn = count()
+
+    def pool_stats(self) -> PoolStats:
+        # engine.dispose() swaps in a fresh pool, so always read the current one
+        return self.engine.pool.stats()
+
+    def replica_statuses(self) -> list[ReplicaStatus]:
+        return [replica.status() for replica in self.replicas]
+
+    async def check_replicas(self) -> None:
+        await asyncio.gather(*(
+            replica.check(self.replica_config.health_check_timeout_seconds)
+            for replica in self.replicas
+        ))
+
+    def pick_replica(self) -> Replica | None:
+        # healthy replicas within the lag budget; None means use the primary
+        candidates = [
+            replica
+            for replica in self.replicas
+            if replica.healthy and replica.lag is not None and replica.lag <= self.replica_config.max_lag_seconds
+        ]
+        if not candidates:
+            return None
+        # rotate on every pick so round robin advances and load ties spread out
+        start = next(self._turn) % len(candidates)
+        candidates = candidates[start:] + candidates[:start]
+        if self.replica_config.balancing == "round_robin":
+            return candidates[0]
+        return min(candidates, key=lambda replica: replica.engine.pool.checkedout())
+
+    def read_session_factory(self, primary: bool = False) -> async_sessionmaker[AsyncSession]:
+        replica = None if primary else self.pick_replica()
+        return self.session_factory if replica is None else replica.session_factory
+
+    async def dispose(self) -> None:
+        await self.engine.dispose()
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
     def get_scoped_session(self):
         session = async_scoped_session(
             session_factory=self.session_factory,
@@ -35,8 +203,95 @@ class DatabaseHelper:
         yield session
         await session.remove()
 
+    async def request_session_dependency(self, request: Request) -> AsyncSession:
+        return request_sessions(request).primary()
+
+    async def read_session_dependency(self, request: Request) -> AsyncSession:
+        # for read-only routes: a replica unless this client wrote recently
+        sessions = request_sessions(request)
+        if READ_PRIMARY_COOKIE not in request.cookies:
+            return sessions.read()
+        session = sessions.primary()
+        session.info[READ_OWN_WRITES] = True
+        return session
+
+
+class RequestSessions:
+    """The sessions of one request, each created on first use.
+
+    A session checks out a connection on its first query and returns it on
+    commit/rollback, or when RequestSessionMiddleware closes it.
+    """
+
+    def __init__(self, db: DatabaseHelper):
+        self.db = db
+        self._primary: AsyncSession | None = None
+        self._read: AsyncSession | None = None
+
+    def primary(self) -> AsyncSession:
+        if self._primary is None:
+            self._primary = self.db.session_factory()
+        return self._primary
+
+    def read(self) -> AsyncSession:
+        if self._read is None:
+            factory = self.db.read_session_factory()
+            if factory is self.db.session_factory:
+                # no replica to use: share the primary session and its connection
+                return self.primary()
+            self._read = factory()
+        return self._read
+
+    async def close(self) -> None:
+        primary, read, self._primary, self._read = self._primary, self._read, None, None
+        for session in (primary, read):
+            if session is not None:
+                await session.close()
+
+
+def request_sessions(request: Request) -> RequestSessions:
+    sessions = request.scope.get("state", {}).get(REQUEST_SESSIONS)
+    if sessions is None:
+        raise RuntimeError("RequestSessionMiddleware is not installed")
+    return sessions
+
+
+class RequestSessionMiddleware:
+    """Gives every HTTP request lazy sessions and closes them when the response starts.
+
+    Dependency teardown only runs after the body has been sent; closing at
+    response start hands the connection back earlier. Response bodies are
+    rendered by then, so a streaming body that queries must open its own
+    session.
+    """
+
+    def __init__(self, app: ASGIApp, db: DatabaseHelper):
+        self.app = app
+        self.db = db
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sessions = RequestSessions(self.db)
+        scope.setdefault("state", {})[REQUEST_SESSIONS] = sessions
+
+        async def send_closing(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                await sessions.close()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_closing)
+        finally:
+            await sessions.close()
+
 
 db_helper = DatabaseHelper(
     url=settings.db_url,
     echo=settings.db_echo,
+    pool=settings.db_pool,
+    replicas=settings.db_replicas,
 )
+if settings.query_cache.enabled:
+    query_cache.install()
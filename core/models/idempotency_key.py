@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import String, Text, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class IdempotencyKey(Base):
+    # the first response per (scope, Idempotency-Key), see core/idempotency.py
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),)
+
+    scope: Mapped[str] = mapped_column(String(64))
+    key: Mapped[str] = mapped_column(String(255))
+    # sha256 of the request payload; a reused key must come with the same one
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    # both null while the first request is still running
+    status_code: Mapped[int | None]
+    body: Mapped[str | None] = mapped_column(Text)
+    # indexed for the TTL purge
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now(), index=True)
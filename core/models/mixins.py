@@ -1,6 +1,7 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import BigInteger, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import declared_attr, Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
@@ -23,3 +24,16 @@ class UserRelationMixin:
     @declared_attr
     def user(cls) -> Mapped["User"]:
         return relationship("User", back_populates=cls._user_back_populate)
+
+
+class SalesRollupMixin:
+    # one row per (bucket, product); bucket is the start of the hour/day
+    bucket: Mapped[datetime]
+    product_id: Mapped[int]
+    units: Mapped[int] = mapped_column(BigInteger)
+    revenue: Mapped[int] = mapped_column(BigInteger)
+
+    @declared_attr.directive
+    def __table_args__(cls) -> tuple:
+        # leading bucket: window queries are range scans on it
+        return (UniqueConstraint("bucket", "product_id", name=f"uq_{cls.__tablename__}_bucket_product"),)
@@ -1,10 +1,10 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import func
+from sqlalchemy import Index, PrimaryKeyConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from .base import Base
+from .base import Base, utc_now
 
 if TYPE_CHECKING:
     from .product import Product
@@ -12,11 +12,29 @@ if TYPE_CHECKING:
 
 
 class Order(Base):
+    # range-partitioned by month on created_at (see jobs/order_partitions.py).
+    # Postgres needs the partition key in the primary key; the ORM keeps
+    # identifying an order by its id alone.
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "created_at"),
+        # serves the order history keyset (created_at desc, id desc)
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id: Mapped[int] = mapped_column(autoincrement=True)
+    __mapper_args__ = {"primary_key": [id]}
+
     promocode: Mapped[str | None]
+    # UTC, from the database clock like the rollup and archive cutoffs
     created_at: Mapped[datetime] = mapped_column(
-        server_default=func.now(),
+        server_default=utc_now(),
         default=datetime.utcnow
     )
+    # denormalized sum(count * price) / sum(count) over the order's lines,
+    # kept current by the order write paths in api_v1/orders/crud.py
+    total: Mapped[int] = mapped_column(default=0, server_default="0")
+    items_count: Mapped[int] = mapped_column(default=0, server_default="0")
     products: Mapped[list["Product"]] = relationship(
         secondary='order_product_association',
         back_populates='orders',
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, Index, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from .base import Base
+
+
+class ArchivedOrder(Base):
+    # cold copy of orders moved out by jobs/order_archive.py; keeps the
+    # original ids so lookups fall through to it transparently
+    __tablename__ = "orders_archive"
+    __table_args__ = (Index("ix_orders_archive_created_at_id", "created_at", "id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    promocode: Mapped[str | None]
+    created_at: Mapped[datetime]
+    total: Mapped[int]
+    items_count: Mapped[int]
+    archived_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+    products_details: Mapped[list["ArchivedOrderLine"]] = relationship(back_populates="order")
+
+
+class ArchivedOrderLine(Base):
+    __tablename__ = "order_product_association_archive"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders_archive.id"), index=True)
+    # no FK to products: archived history must not pin the catalog
+    product_id: Mapped[int]
+    count: Mapped[int]
+
+    order: Mapped["ArchivedOrder"] = relationship(back_populates="products_details")
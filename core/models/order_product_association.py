@@ -1,6 +1,7 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy import ForeignKey, ForeignKeyConstraint, PrimaryKeyConstraint, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
@@ -13,16 +14,27 @@ if TYPE_CHECKING:
 
 class OrderProductAssociation(Base):
     __tablename__ = "order_product_association"
+    # partitioned like orders, on a copy of the order's created_at
     __table_args__ = (
+        PrimaryKeyConstraint("id", "order_created_at"),
         UniqueConstraint(
             'order_id',
             'product_id',
+            'order_created_at',
             name="idx_unique_order_product",
         ),
+        ForeignKeyConstraint(
+            ["order_id", "order_created_at"],
+            ["orders.id", "orders.created_at"],
+        ),
+        {"postgresql_partition_by": "RANGE (order_created_at)"},
     )
 
-    id: Mapped[int] = mapped_column(primary_key=True)
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id"))
+    id: Mapped[int] = mapped_column(autoincrement=True)
+    __mapper_args__ = {"primary_key": [id]}
+
+    order_id: Mapped[int]
+    order_created_at: Mapped[datetime]
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"))
     count: Mapped[int] = mapped_column(default=1, server_default="1")
 
@@ -1,6 +1,8 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy.orm import Mapped, relationship
+from sqlalchemy import DDL, String, UniqueConstraint, event, func
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .base import Base
 
@@ -11,13 +13,46 @@ if TYPE_CHECKING:
 
 
 class Product(Base):
+    __table_args__ = (
+        UniqueConstraint("sku", name="uq_products_sku"),
+    )
+
     name: Mapped[str]
     description: Mapped[str]
     price: Mapped[int]
+    sku: Mapped[str | None] = mapped_column(String(64))
+    version: Mapped[int] = mapped_column(default=1, server_default="1")
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(),
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+    )
 
     orders: Mapped[list["Order"]] = relationship(
         secondary='order_product_association',
         back_populates='products'
     )
 
-    order_details: Mapped[list["OrderProductAssociation"]] = relationship(back_populates="products")
+    order_details: Mapped[list["OrderProductAssociation"]] = relationship(back_populates="product")
+
+
+# SQLite (local development and tests) has no search_vector column: an
+# external-content FTS5 table, kept in sync by triggers, is created and
+# dropped with products instead (api_v1.products.search queries it)
+SQLITE_FTS_DDL = (
+    "CREATE VIRTUAL TABLE products_fts USING fts5("
+    "name, description, content='products', content_rowid='id')",
+    "CREATE TRIGGER products_fts_ai AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER products_fts_ad AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER products_fts_au AFTER UPDATE ON products BEGIN "
+    "INSERT INTO products_fts(products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO products_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+)
+
+for ddl in SQLITE_FTS_DDL:
+    event.listen(Product.__table__, "after_create", DDL(ddl).execute_if(dialect="sqlite"))
+event.listen(Product.__table__, "before_drop", DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"))
@@ -0,0 +1,30 @@
+from sqlalchemy import ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class ProductPairCount(Base):
+    # how many orders contained both products; stored in both directions
+    __tablename__ = "product_pair_counts"
+    __table_args__ = (
+        UniqueConstraint("product_id", "related_id", name="uq_product_pair_counts_pair"),
+    )
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"))
+    # indexed for the ON DELETE CASCADE from products
+    related_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"), index=True)
+    count: Mapped[int]
+
+
+class RelatedProduct(Base):
+    # top-K of product_pair_counts per product, ranked 1..K
+    __tablename__ = "related_products"
+    __table_args__ = (
+        UniqueConstraint("product_id", "rank", name="uq_related_products_rank"),
+    )
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"))
+    rank: Mapped[int]
+    related_id: Mapped[int] = mapped_column(ForeignKey("products.id", ondelete="CASCADE"), index=True)
+    count: Mapped[int]
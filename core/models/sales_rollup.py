@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+from .mixins import SalesRollupMixin
+
+
+class HourlySales(SalesRollupMixin, Base):
+    __tablename__ = "sales_hourly"
+
+
+class DailySales(SalesRollupMixin, Base):
+    __tablename__ = "sales_daily"
+
+
+class RollupWatermark(Base):
+    # how far each incremental job has processed its source
+    __tablename__ = "rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(String(64), unique=True)
+    watermark: Mapped[datetime]
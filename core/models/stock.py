@@ -0,0 +1,16 @@
+from sqlalchemy import CheckConstraint, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class Stock(Base):
+    # one row per tracked product; products without a row are not
+    # stock-limited. Reservations decrement quantity in place.
+    __table_args__ = (CheckConstraint("quantity >= 0", name="ck_stocks_quantity_non_negative"),)
+
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"),
+        unique=True,
+    )
+    quantity: Mapped[int] = mapped_column(default=0, server_default="0")
@@ -0,0 +1,317 @@
+import hashlib
+import pickle
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from math import ceil
+from time import monotonic
+from typing import Any, Iterable, Iterator, Protocol, Sequence
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.engine import FrozenResult, Result
+from sqlalchemy.orm import ORMExecuteState, Session, attributes, loading
+from sqlalchemy.orm.base import PASSIVE_NO_INITIALIZE
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import ColumnClause
+from sqlalchemy.sql.selectable import AliasedReturnsRows
+from sqlalchemy.sql.util import find_tables
+from sqlalchemy.util import await_only
+
+from core.cache import LRUCache
+from core.config import settings
+
+# opt a read in: stmt.execution_options(query_cache=True)
+CACHE_OPTION = "query_cache"
+# tables written by the session's current transaction, re-invalidated on commit
+PENDING_TAGS = "query_cache_pending"
+# session.info flag: serve hits but never store what this session reads
+NO_STORE = "query_cache_no_store"
+
+# tables read by relationship loads running inside a cached read
+_loaded_tables: ContextVar[set[str] | None] = ContextVar("query_cache_loaded_tables", default=None)
+
+
+def _walk(statement) -> Iterator[Any]:
+    # visitors.iterate() does not enter a CTE or subquery that is only
+    # referenced by its columns (UPDATE ... WHERE id = cte.c.id)
+    seen = set()
+    stack = [statement]
+    while stack:
+        element = stack.pop()
+        if id(element) in seen:
+            continue
+        seen.add(id(element))
+        yield element
+        stack.extend(element.get_children())
+        if isinstance(element, ColumnClause) and isinstance(element.table, AliasedReturnsRows):
+            stack.append(element.table)
+
+
+class QueryCacheStats(BaseModel):
+    hits: int
+    misses: int
+    stores: int
+    invalidations: int
+
+
+class QueryCacheBackend(ABC):
+    """Storage for cached results and the per-table generation counters.
+
+    A cache key embeds the generations of the tables its statement read, so
+    bumping a table's generation orphans exactly the entries that read it.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> FrozenResult | None:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: FrozenResult, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def generations(self, tags: Sequence[str]) -> list[int]:
+        ...
+
+    @abstractmethod
+    def bump(self, tags: Iterable[str]) -> None:
+        ...
+
+
+class MemoryBackend(QueryCacheBackend):
+    # per process: other workers' writes only show up after the TTL
+    def __init__(self, max_size: int):
+        self.entries: LRUCache[str, FrozenResult] = LRUCache(max_size)
+        self._generations: dict[str, int] = {}
+
+    def get(self, key: str) -> FrozenResult | None:
+        return self.entries.get(key)
+
+    def set(self, key: str, value: FrozenResult, ttl: float) -> None:
+        self.entries.set(key, value, ttl)
+
+    def generations(self, tags: Sequence[str]) -> list[int]:
+        return [self._generations.get(tag, 0) for tag in tags]
+
+    def bump(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+
+class KeyValueStore(Protocol):
+    # the subset of redis.asyncio.Redis the shared backend uses
+    async def get(self, key: str) -> bytes | None:
+        ...
+
+    async def mget(self, keys: Sequence[str]) -> list[bytes | None]:
+        ...
+
+    async def set(self, key: str, value: bytes, ex: int | None = None) -> Any:
+        ...
+
+    async def incr(self, key: str) -> int:
+        ...
+
+
+class LocalStore:
+    """In-process KeyValueStore standing in for Redis in tests and development."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[float | None, bytes]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        item = self._data.get(key)
+        if item is None or (item[0] is not None and item[0] <= monotonic()):
+            return None
+        return item[1]
+
+    async def mget(self, keys: Sequence[str]) -> list[bytes | None]:
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key: str, value: bytes, ex: int | None = None) -> None:
+        self._data[key] = (monotonic() + ex if ex is not None else None, value)
+
+    async def incr(self, key: str) -> int:
+        value = int(await self.get(key) or 0) + 1
+        self._data[key] = (None, str(value).encode())
+        return value
+
+
+class SharedBackend(QueryCacheBackend):
+    """Results and generations in a store shared by all workers.
+
+    Session events are synchronous but run inside SQLAlchemy's greenlet,
+    so the async store is awaited with ``await_only``; AsyncSession only.
+    """
+
+    def __init__(self, store: KeyValueStore, prefix: str = "query-cache:"):
+        self.store = store
+        self.prefix = prefix
+
+    def get(self, key: str) -> FrozenResult | None:
+        raw = await_only(self.store.get(self.prefix + key))
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: FrozenResult, ttl: float) -> None:
+        await_only(self.store.set(self.prefix + key, pickle.dumps(value), ex=ceil(ttl)))
+
+    def generations(self, tags: Sequence[str]) -> list[int]:
+        raw = await_only(self.store.mget([f"{self.prefix}gen:{tag}" for tag in tags]))
+        return [int(value or 0) for value in raw]
+
+    def bump(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            await_only(self.store.incr(f"{self.prefix}gen:{tag}"))
+
+
+class ResultCache:
+    """Second-level cache of ORM read results, keyed on SQL, parameters and table generations.
+
+    Only statements carrying the ``query_cache`` execution option are cached.
+    Writes through the Session (flushes, insert/update/delete statements and
+    SELECTs over data-modifying CTEs) invalidate the tables they touch right
+    away and again on commit, so nothing read in between outlives the
+    transaction. Writes that bypass the Session (text() SQL, other services)
+    are only bounded by the TTL. Sessions flagged NO_STORE (replicas) read
+    cached results but never store their own.
+    """
+
+    def __init__(self, backend: QueryCacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        # statement cache key -> (SQL, tables read)
+        self._statements: LRUCache[Any, tuple[str, frozenset[str]]] = LRUCache(max_size=1000)
+        # statement cache key -> tables written
+        self._writes: LRUCache[Any, frozenset[str]] = LRUCache(max_size=1000)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    def install(self, session_class: type[Session] = Session) -> None:
+        event.listen(session_class, "do_orm_execute", self._on_execute)
+        event.listen(session_class, "after_flush", self._on_flush)
+        event.listen(session_class, "after_commit", self._on_commit)
+        event.listen(session_class, "after_rollback", self._on_rollback)
+
+    def invalidate(self, session: Session, tags: Iterable[str]) -> None:
+        tags = set(tags)
+        if not tags:
+            return
+        self.backend.bump(tags)
+        session.info.setdefault(PENDING_TAGS, set()).update(tags)
+
+    def stats(self) -> QueryCacheStats:
+        return QueryCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            stores=self.stores,
+            invalidations=self.invalidations,
+        )
+
+    def _on_execute(self, state: ORMExecuteState) -> Result | None:
+        if not (state.is_select or state.is_insert or state.is_update or state.is_delete):
+            return None
+        written = self._written_tables(state.statement)
+        if written:
+            self.invalidate(state.session, written)
+            return None
+        loaded_tables = _loaded_tables.get()
+        if loaded_tables is not None and state.is_relationship_load:
+            loaded_tables.update(table.name for table in find_tables(state.statement))
+            return None
+        if not state.execution_options.get(CACHE_OPTION) or state.execution_options.get("yield_per"):
+            return None
+        return self._cached(state)
+
+    def _written_tables(self, statement) -> frozenset[str]:
+        # the statement's own target and those of INSERT/UPDATE/DELETE CTEs,
+        # including WITH ... SELECT statements that only read their RETURNING
+        cache_key = statement._generate_cache_key()
+        written = self._writes.get(cache_key.key) if cache_key is not None else None
+        if written is None:
+            written = frozenset(
+                element.table.name
+                for element in _walk(statement)
+                if isinstance(element, UpdateBase)
+            )
+            if cache_key is not None:
+                self._writes.set(cache_key.key, written)
+        return written
+
+    def _cached(self, state: ORMExecuteState) -> Result | None:
+        cache_key = state.statement._generate_cache_key()
+        if cache_key is None:
+            return None
+        statement_info = self._statements.get(cache_key.key)
+        if statement_info is None:
+            compiled = state.statement.compile(dialect=state.session.get_bind(mapper=state.bind_mapper).dialect)
+            # the ORM compile state includes eager joins the statement itself lacks
+            compile_state = getattr(compiled, "compile_state", None)
+            tables = find_tables(compile_state.statement if compile_state is not None else state.statement)
+            statement_info = (str(compiled), frozenset(table.name for table in tables))
+        sql, tags = statement_info
+        parameters = state.parameters or {}
+        if cache_key.bindparams:
+            params = tuple(parameters.get(bind.key, bind.effective_value) for bind in cache_key.bindparams)
+        else:
+            params = tuple(parameters[name] for name in sorted(parameters))
+        key = self._key(sql, params, tags)
+
+        frozen = self.backend.get(key)
+        if frozen is not None:
+            self.hits += 1
+            return loading.merge_frozen_result(state.session, state.statement, frozen, load=False)()
+
+        self.misses += 1
+        token = _loaded_tables.set(set(tags))
+        try:
+            frozen = state.invoke_statement().freeze()
+        finally:
+            loaded_tables = frozenset(_loaded_tables.get())
+            _loaded_tables.reset(token)
+        self._statements.set(cache_key.key, (sql, loaded_tables))
+        # relationship loads read more tables than the key covered; store from the next read on
+        if loaded_tables == tags and not state.session.info.get(NO_STORE):
+            self.backend.set(key, frozen, self.ttl)
+            self.stores += 1
+        return frozen()
+
+    def _key(self, sql: str, params: tuple, tags: frozenset[str]) -> str:
+        ordered = sorted(tags)
+        generations = self.backend.generations(ordered)
+        return hashlib.sha256(repr((sql, params, tuple(zip(ordered, generations)))).encode()).hexdigest()
+
+    def _on_flush(self, session: Session, flush_context) -> None:
+        tags = set()
+        deleted = set(session.deleted)
+        for obj in (*session.new, *session.dirty, *deleted):
+            mapper = type(obj).__mapper__
+            tags.update(table.name for table in mapper.tables)
+            # association rows are only written for changed collections
+            # (and removed along with a deleted object)
+            tags.update(
+                rel.secondary.name
+                for rel in mapper.relationships
+                if rel.secondary is not None and (
+                    obj in deleted
+                    or attributes.get_history(obj, rel.key, PASSIVE_NO_INITIALIZE).has_changes()
+                )
+            )
+        self.invalidate(session, tags)
+
+    def _on_commit(self, session: Session) -> None:
+        tags = session.info.pop(PENDING_TAGS, None)
+        if tags:
+            # readers that ran mid-transaction may have cached the old rows
+            self.backend.bump(tags)
+            self.invalidations += 1
+
+    def _on_rollback(self, session: Session) -> None:
+        session.info.pop(PENDING_TAGS, None)
+
+
+query_cache = ResultCache(
+    backend=MemoryBackend(max_size=settings.query_cache.max_size),
+    ttl=settings.query_cache.ttl_seconds,
+)
@@ -0,0 +1,150 @@
+import logging
+import re
+import sys
+import traceback
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from time import perf_counter
+
+from greenlet import getcurrent
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.config import BASE_DIR, SqlInstrumentation
+
+log = logging.getLogger(__name__)
+
+# IN (...) lists expand to one placeholder per value; count them as one shape
+PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\$\d+|\?|%\(\w+\)s)(?:\s*,\s*(?:\$\d+|\?|%\(\w+\)s))*\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+class RequestQueryStats:
+    """Statements one request ran, fed by the engine hooks of ``instrument``."""
+
+    def __init__(self, n_plus_one_threshold: int | None = None):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_statement: str | None = None
+        self.shapes: Counter[str] = Counter()
+        # shape -> call site of the statement that crossed the threshold
+        self.repeated: dict[str, str | None] = {}
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.slowest:
+            self.slowest, self.slowest_statement = duration, statement
+        if self.n_plus_one_threshold is None:
+            return
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == self.n_plus_one_threshold + 1:
+            self.repeated[shape] = call_site()
+
+    def server_timing(self) -> str:
+        return (
+            f'db;desc="{self.count} queries";dur={self.total * 1000:.2f}, '
+            f"db-slowest;dur={self.slowest * 1000:.2f}"
+        )
+
+
+current_query_stats: ContextVar[RequestQueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+def statement_shape(statement: str) -> str:
+    return PLACEHOLDER_LIST.sub("(?)", WHITESPACE.sub(" ", statement).strip())
+
+
+def call_site() -> str | None:
+    # engine events run in SQLAlchemy's sync greenlet; the awaiting
+    # application code is on the stack of the greenlet driving it
+    driver = getattr(getcurrent(), "driver", None)
+    frame = driver.gr_frame if driver is not None else sys._getframe()
+    for summary in reversed(traceback.extract_stack(frame)):
+        path = Path(summary.filename)
+        if BASE_DIR in path.parents and "site-packages" not in path.parts and path != Path(__file__):
+            return f"{path.relative_to(BASE_DIR)}:{summary.lineno} in {summary.name}"
+    return None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_query_stats.get() is not None:
+        conn.info.setdefault("query_started", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_query_stats.get()
+    if stats is not None and conn.info.get("query_started"):
+        stats.record(statement, perf_counter() - conn.info["query_started"].pop())
+
+
+def instrument(engine: AsyncEngine) -> None:
+    # no-ops outside of a request tracked by QueryStatsMiddleware
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Counts and times the SQL of each HTTP request.
+
+    Adds a Server-Timing header, logs one line per request that touched the
+    database (fields in ``extra``) and, when a threshold is set, warns about
+    statements repeated more often than that within one request.
+    """
+
+    def __init__(self, app: ASGIApp, config: SqlInstrumentation):
+        self.app = app
+        self.config = config
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.config.enabled:
+            await self.app(scope, receive, send)
+            return
+        stats = RequestQueryStats(self.config.n_plus_one_threshold)
+        token = current_query_stats.set(stats)
+        status_code = None
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.config.server_timing:
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            self.report(scope, status_code, stats)
+
+    def report(self, scope: Scope, status_code: int | None, stats: RequestQueryStats) -> None:
+        if not stats.count:
+            return
+        fields = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "status_code": status_code,
+            "db_queries": stats.count,
+            "db_ms": round(stats.total * 1000, 2),
+            "db_slowest_ms": round(stats.slowest * 1000, 2),
+            "db_slowest_statement": (stats.slowest_statement or "")[:500],
+        }
+        log.info(
+            "%s %s: %d queries in %.2fms",
+            fields["method"], fields["path"], stats.count, fields["db_ms"],
+            extra=fields,
+        )
+        for shape, site in stats.repeated.items():
+            log.warning(
+                "possible N+1 in %s %s: statement ran %d times (threshold %d) at %s: %s",
+                fields["method"], fields["path"], stats.shapes[shape], self.config.n_plus_one_threshold,
+                site, shape[:200],
+                extra={**fields, "n_plus_one_statement": shape, "n_plus_one_count": stats.shapes[shape], "call_site": site},
+            )
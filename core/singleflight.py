@@ -0,0 +1,74 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class SingleFlightStats(BaseModel):
+    calls: int
+    executions: int
+    coalesced: int
+    in_flight: int
+
+
+def _consume_result(future: asyncio.Future) -> None:
+    # nobody may be waiting on a failed flight; don't log it as unretrieved
+    if not future.cancelled():
+        future.exception()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls sharing a key into one execution.
+
+    The first caller for a key runs ``fn``; callers arriving while it is
+    in flight await the same result instead of running it again.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        coalesced = False
+        while (future := self._in_flight.get(key)) is not None:
+            if not coalesced:
+                self.coalesced += 1
+                coalesced = True
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # the leader was cancelled (e.g. client went away): take over
+                if not future.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_result)
+        self._in_flight[key] = future
+        self.executions += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def stats(self) -> SingleFlightStats:
+        return SingleFlightStats(
+            calls=self.calls,
+            executions=self.executions,
+            coalesced=self.coalesced,
+            in_flight=len(self._in_flight),
+        )
@@ -40,7 +40,7 @@ async def create_profile(
 async def get_users_with_posts(
         session: AsyncSession
 ):
-    stmt = select(User).options(selectinload(User.posts)).order_by(User.id)
+    stmt = select(User).options(selectinload(User.posts)).order_by(User.id).execution_options(query_cache=True)
     # users = await session.scalars(stmt)
     result: Result = await session.execute(stmt)
     users = result.scalars()
@@ -52,7 +52,7 @@ async def get_users_with_posts(
 
 
 async def get_posts_with_authors(session: AsyncSession):
-    stmt = select(Post).options(joinedload(Post.user)).order_by(Post.id)
+    stmt = select(Post).options(joinedload(Post.user)).order_by(Post.id).execution_options(query_cache=True)
     posts = await session.scalars(stmt)
 
     for post in posts:  # type: Post
@@ -62,7 +62,7 @@ async def get_posts_with_authors(session: AsyncSession):
 
 
 async def show_users_with_profiles(session: AsyncSession):
-    stmt = select(User).options(joinedload(User.profile)).order_by(User.id)
+    stmt = select(User).options(joinedload(User.profile)).order_by(User.id).execution_options(query_cache=True)
     users = await session.scalars(stmt)
     for user in users:
         print(f"User", user)
@@ -70,7 +70,12 @@ async def show_users_with_profiles(session: AsyncSession):
 
 
 async def show_users_with_post_and_profiles(session: AsyncSession):
-    stmt = select(User).options(joinedload(User.profile), selectinload(User.posts)).order_by(User.id)
+    stmt = (
+        select(User)
+        .options(joinedload(User.profile), selectinload(User.posts))
+        .order_by(User.id)
+        .execution_options(query_cache=True)
+    )
     users = await session.scalars(stmt)
     for user in users:
         print(f"User", user)
@@ -104,6 +109,7 @@ async def get_profiles_with_users_and_users_whit_posts(session: AsyncSession):
         )
         .where(User.username == 'Alex')
         .order_by(Profile.id)
+        .execution_options(query_cache=True)
     )
     profiles = await session.scalars(stmt)
     for profile in profiles:  # type Profile
@@ -224,7 +230,7 @@ async def main_relations(session):
 
 
 async def main():
-    async with db_helper.session_factory() as session:
+    async with db_helper.read_session_factory()() as session:
         await get_users_with_posts(session=session)
 
 
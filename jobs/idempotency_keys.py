@@ -0,0 +1,28 @@
+"""Delete Idempotency-Key responses older than settings.idempotency.ttl_seconds.
+
+    python -m jobs.idempotency_keys
+
+Expired keys are already ignored by new requests; this only reclaims the
+rows. The app also runs it periodically (settings.idempotency.purge).
+"""
+import asyncio
+
+from core.idempotency import idempotency_store
+from core.models import db_helper
+
+
+async def purge() -> int:
+    async with db_helper.session_factory() as session:
+        return await idempotency_store.purge(session)
+
+
+async def main():
+    try:
+        purged = await purge()
+        print(f"purged {purged} expired idempotency keys")
+    finally:
+        await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""Move old orders and their lines into the archive tables.
+
+    python -m jobs.order_archive --after-days 365
+
+Works in batches of settings.order_archive.batch_size orders, one short
+transaction each, pausing between batches so live traffic keeps the
+connections and I/O. Safe to interrupt and re-run.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from api_v1.orders.crud import archive_orders
+from core.config import settings
+from core.models import db_helper
+
+
+async def archive(before: datetime, batch_size: int, pause: float) -> tuple[int, int]:
+    orders_total = lines_total = 0
+    async with db_helper.session_factory() as session:
+        while True:
+            orders_moved, lines_moved = await archive_orders(
+                session=session,
+                before=before,
+                batch_size=batch_size,
+            )
+            orders_total += orders_moved
+            lines_total += lines_moved
+            if orders_moved == 0:
+                return orders_total, lines_total
+            await asyncio.sleep(pause)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--after-days", type=int, default=settings.order_archive.after_days)
+    parser.add_argument("--batch-size", type=int, default=settings.order_archive.batch_size)
+    parser.add_argument("--pause", type=float, default=settings.order_archive.pause_seconds)
+    args = parser.parse_args()
+
+    before = datetime.utcnow() - timedelta(days=args.after_days)
+    started = perf_counter()
+    try:
+        orders_moved, lines_moved = await archive(before, args.batch_size, args.pause)
+        print(
+            f"archived {orders_moved} orders and {lines_moved} lines created before "
+            f"{before:%Y-%m-%d} in {perf_counter() - started:.1f}s"
+        )
+    finally:
+        await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""Create the monthly orders / order_product_association partitions ahead of time.
+
+    python -m jobs.order_partitions --months-ahead 3
+
+Rows outside every monthly partition land in the *_default partitions, which
+are never pruned, so the partitions should exist before their month starts.
+If they don't, create_order_partitions() moves the month's rows over.
+The app also runs this periodically (settings.order_partitions).
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import text
+
+from core.models import db_helper
+
+# months of orders.created_at, which is UTC; rows of a month that has no
+# partition yet are moved out of the default partition when it is created
+CREATE_PARTITIONS = text(
+    """
+    SELECT create_order_partitions(
+        CAST(timezone('utc', now()) AS date),
+        CAST(timezone('utc', now()) + make_interval(months => :months_ahead) AS date)
+    )
+    """
+)
+
+
+async def create_partitions(months_ahead: int) -> int:
+    async with db_helper.session_factory() as session:
+        if session.bind.dialect.name != "postgresql":
+            return 0
+        created = await session.scalar(CREATE_PARTITIONS, {"months_ahead": months_ahead})
+        await session.commit()
+    return created
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--months-ahead", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        created = await create_partitions(args.months_ahead)
+        print(f"created {created} monthly partitions")
+    finally:
+        await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
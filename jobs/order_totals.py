@@ -0,0 +1,37 @@
+"""Repair drift in the denormalized orders.total / orders.items_count.
+
+    python -m jobs.order_totals --batch-size 10000
+
+The write paths keep the totals current incrementally; this recomputes
+them from the lines (one aggregate UPDATE per id range) and only touches
+orders whose stored values differ, e.g. after a product price change.
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import func, select
+
+from api_v1.orders.crud import recompute_order_totals
+from core.models import db_helper, Order
+
+
+async def main(batch_size: int) -> None:
+    async with db_helper.session_factory() as session:
+        max_id = await session.scalar(select(func.max(Order.id)))
+        repaired = 0
+        for min_id in range(1, (max_id or 0) + 1, batch_size):
+            # one short transaction per range keeps row locks brief
+            repaired += await recompute_order_totals(
+                session=session,
+                min_id=min_id,
+                max_id=min_id + batch_size,
+            )
+    print(f"repaired {repaired} orders (max id {max_id})")
+    await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+    asyncio.run(main(batch_size=args.batch_size))
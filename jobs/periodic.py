@@ -0,0 +1,16 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+log = logging.getLogger(__name__)
+
+
+async def run_periodically(name: str, fn: Callable[[], Awaitable[object]], interval: float) -> None:
+    # background maintenance started from the app lifespan; a failed run
+    # is logged and retried on the next tick
+    while True:
+        try:
+            await fn()
+        except Exception:
+            log.exception("%s failed", name)
+        await asyncio.sleep(interval)
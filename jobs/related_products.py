@@ -0,0 +1,49 @@
+"""Build the "frequently bought together" index from orders since the watermark.
+
+    python -m jobs.related_products [--rebuild]
+
+Needs the optional dependencies: poetry install --with recommendations.
+Incremental: each run folds in orders created since the previous one
+(older than settings.related_products.lag_seconds). Lines edited on orders
+that were already indexed are only picked up by --rebuild.
+"""
+import argparse
+import asyncio
+from datetime import timedelta
+from time import perf_counter
+
+from sqlalchemy import select
+
+from api_v1.products.related import refresh_related_products, reset_related_products
+from core.config import settings
+from core.models import db_helper, utc_now
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="drop the index and recount all orders")
+    args = parser.parse_args()
+
+    config = settings.related_products
+    started = perf_counter()
+    try:
+        async with db_helper.session_factory() as session:
+            # the database clock, the one orders.created_at comes from
+            until = await session.scalar(select(utc_now() - timedelta(seconds=config.lag_seconds)))
+            if args.rebuild:
+                await reset_related_products(session)
+            while (refreshed := await refresh_related_products(
+                    session=session,
+                    until=until,
+                    top_k=config.top_k,
+                    slice_length=timedelta(hours=config.slice_hours),
+            )) is not None:
+                start, end, pairs = refreshed
+                print(f"{start:%Y-%m-%d %H:%M} .. {end:%Y-%m-%d %H:%M}: {pairs} product pairs")
+        print(f"done in {perf_counter() - started:.1f}s")
+    finally:
+        await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,32 @@
+"""Refresh the hourly/daily sales rollups from the last watermark.
+
+    python -m jobs.sales_rollups
+
+The app also runs this every settings.sales_rollups.interval_seconds.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from api_v1.analytics.crud import refresh_sales_rollups
+from core.config import settings
+from core.models import db_helper
+
+
+async def refresh(lag: float) -> tuple[datetime, datetime] | None:
+    async with db_helper.session_factory() as session:
+        if session.bind.dialect.name != "postgresql":
+            return None
+        return await refresh_sales_rollups(session=session, lag=timedelta(seconds=lag))
+
+
+async def main():
+    try:
+        refreshed = await refresh(settings.sales_rollups.lag_seconds)
+        if refreshed is not None:
+            print(f"refreshed sales rollups for {refreshed[0]:%Y-%m-%d %H:%M} .. {refreshed[1]:%Y-%m-%d %H:%M}")
+    finally:
+        await db_helper.engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
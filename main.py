@@ -1,23 +1,78 @@
+import asyncio
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 
 from core.config import settings
+from core.models import db_helper
+from core.models.db_helper import READ_PRIMARY_COOKIE, RequestSessionMiddleware
+from core.query_stats import QueryStatsMiddleware
 from api_v1 import router as router_v1
 from items_views import router as items_router
+from jobs import idempotency_keys, order_partitions, sales_rollups
+from jobs.periodic import run_periodically
 from users.views import router as users_router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    tasks = []
+    if settings.order_partitions.maintain:
+        tasks.append(asyncio.create_task(run_periodically(
+            "order partitions",
+            lambda: order_partitions.create_partitions(settings.order_partitions.months_ahead),
+            settings.order_partitions.interval_seconds,
+        )))
+    if settings.sales_rollups.refresh:
+        tasks.append(asyncio.create_task(run_periodically(
+            "sales rollups",
+            lambda: sales_rollups.refresh(settings.sales_rollups.lag_seconds),
+            settings.sales_rollups.interval_seconds,
+        )))
+    if settings.idempotency.purge:
+        tasks.append(asyncio.create_task(run_periodically(
+            "idempotency key purge",
+            idempotency_keys.purge,
+            settings.idempotency.purge_interval_seconds,
+        )))
+    if db_helper.replicas:
+        tasks.append(asyncio.create_task(run_periodically(
+            "replica health checks",
+            db_helper.check_replicas,
+            settings.db_replicas.health_check_interval_seconds,
+        )))
     yield
+    for task in tasks:
+        task.cancel()
+    # let the jobs unwind before their engine goes away
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await db_helper.dispose()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(RequestSessionMiddleware, db=db_helper)
+app.add_middleware(QueryStatsMiddleware, config=settings.sql_instrumentation)
 app.include_router(router=router_v1, prefix=settings.api_v1_prefix)
 app.include_router(items_router)
 app.include_router(users_router)
 
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    # replicas may not have the write yet: pin this client's reads to the primary
+    response = await call_next(request)
+    if db_helper.replicas and request.method not in SAFE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            "1",
+            max_age=settings.db_replicas.sticky_seconds,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
 
 @app.get("/")
 async def root():
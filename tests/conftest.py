@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# core.config needs these at import time; the suite never connects with them
+for name, value in {
+    "DB_HOST": "localhost",
+    "DB_PORT": "5432",
+    "DB_USER": "postgres",
+    "DB_PASS": "postgres",
+    "DB_NAME": "microshop_test",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+def write_jwt_keys() -> None:
+    # auth.utils reads the key pair at import; certs/ is not in the repo
+    certs = Path(tempfile.mkdtemp(prefix="microshop-certs-"))
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    (certs / "jwt-private.pem").write_bytes(key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    (certs / "jwt-public.pem").write_bytes(key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    ))
+    os.environ["AUTH_JWT"] = json.dumps({
+        "private_key_path": str(certs / "jwt-private.pem"),
+        "public_key_path": str(certs / "jwt-public.pem"),
+    })
+
+
+if "AUTH_JWT" not in os.environ:
+    write_jwt_keys()
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from api_v1.products.cache import product_cache
+from core.config import BASE_DIR
+from core.models import Base
+from core.query_cache import MemoryBackend, query_cache
+from core.models import db_helper
+from core.models.db_helper import create_session_factory
+
+# orders and their lines need Postgres (autoincrement id in a composite key)
+SQLITE_TABLES = [
+    table for table in Base.metadata.sorted_tables
+    if table.name not in {"orders", "order_product_association"}
+]
+
+# a throwaway Postgres database (postgresql+asyncpg://...) for the tests
+# that need one; its public schema is dropped and migrated from scratch
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    product_cache.clear()
+    monkeypatch.setattr(query_cache, "backend", MemoryBackend(max_size=1000))
+
+
+@pytest.fixture
+async def sqlite_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'microshop.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=SQLITE_TABLES)
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+async def sqlite_session(sqlite_engine) -> AsyncSession:
+    async with create_session_factory(sqlite_engine)() as session:
+        yield session
+
+
+async def reset_schema(url: str) -> None:
+    engine = create_async_engine(url, poolclass=NullPool)
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP SCHEMA public CASCADE"))
+        await conn.execute(text("CREATE SCHEMA public"))
+    await engine.dispose()
+
+
+async def truncate_all(url: str) -> None:
+    engine = create_async_engine(url, poolclass=NullPool)
+    async with engine.begin() as conn:
+        tables = list(await conn.scalars(text(
+            "SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename <> 'alembic_version'"
+        )))
+        await conn.execute(text(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE"))
+    await engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def pg_url() -> str:
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    asyncio.run(reset_schema(TEST_DATABASE_URL))
+    config = Config(str(BASE_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BASE_DIR / "alembic"))
+    config.attributes["sqlalchemy.url"] = TEST_DATABASE_URL
+    command.upgrade(config, "head")
+    return TEST_DATABASE_URL
+
+
+@pytest.fixture
+async def pg_engine(pg_url):
+    engine = create_async_engine(pg_url, poolclass=NullPool)
+    yield engine
+    await engine.dispose()
+    await truncate_all(pg_url)
+
+
+@pytest.fixture
+async def pg_session(pg_engine) -> AsyncSession:
+    async with create_session_factory(pg_engine)() as session:
+        yield session
+
+
+@pytest.fixture
+async def pg_client(pg_engine, monkeypatch) -> AsyncClient:
+    # the app's sessions all come from db_helper.session_factory
+    from main import app
+
+    monkeypatch.setattr(db_helper, "session_factory", create_session_factory(pg_engine))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        yield client
@@ -0,0 +1,46 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.models import Order, OrderProductAssociation, Product
+
+
+async def create_products(session: AsyncSession, count: int, price: int = 100) -> list[int]:
+    product_ids = await session.scalars(
+        insert(Product).returning(Product.id),
+        [
+            {"name": f"Product {i}", "description": "", "price": price, "sku": f"sku-{i}"}
+            for i in range(count)
+        ],
+    )
+    product_ids = list(product_ids)
+    await session.commit()
+    return product_ids
+
+
+async def create_order(
+        session: AsyncSession,
+        created_at: datetime,
+        lines: dict[int, int],
+        price: int = 100,
+) -> int:
+    # totals as the order write paths would have kept them
+    order_id = await session.scalar(
+        insert(Order)
+        .values(
+            created_at=created_at,
+            total=sum(lines.values()) * price,
+            items_count=sum(lines.values()),
+        )
+        .returning(Order.id)
+    )
+    await session.execute(
+        insert(OrderProductAssociation),
+        [
+            {"order_id": order_id, "order_created_at": created_at, "product_id": product_id, "count": count}
+            for product_id, count in lines.items()
+        ],
+    )
+    await session.commit()
+    return order_id
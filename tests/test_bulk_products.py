@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import func, select
+
+from api_v1.products.crud import upsert_products
+from api_v1.products.shemas import ProductBulkCreate
+from core.models import Product
+
+from .factories import create_products
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_upsert_results_match_inputs(pg_session):
+    (existing_id,) = await create_products(pg_session, 1)
+    products_in = [
+        ProductBulkCreate(name="new b", description="", price=2, sku="b"),
+        ProductBulkCreate(name="updated", description="", price=4, sku="sku-0"),
+        ProductBulkCreate(name="new a", description="", price=1, sku="a"),
+        ProductBulkCreate(name="new a again", description="", price=6, sku="a"),
+    ]
+
+    results = await upsert_products(pg_session, products_in)
+
+    rows = (await pg_session.execute(select(Product.id, Product.name, Product.price))).all()
+    by_id = {row.id: (row.name, row.price) for row in rows}
+    assert [by_id[product_id] for product_id, _ in results] == [
+        ("new b", 2), ("updated", 4), ("new a again", 6), ("new a again", 6),
+    ]
+    assert [created for _, created in results] == [True, False, True, True]
+    assert results[1][0] == existing_id
+    assert results[2] == results[3]
+
+
+async def test_rows_without_sku_are_invalid(pg_client, pg_session):
+    catalog = [
+        {"name": "Lamp", "description": "", "price": 100, "sku": "lamp"},
+        {"name": "Chair", "description": "", "price": 200},
+    ]
+    for _ in range(2):
+        response = await pg_client.post("/api/v1/products/bulk/", json=catalog)
+        items = response.json()["items"]
+        assert items[1]["status"] == "invalid"
+        assert "sku" in items[1]["error"]
+
+    assert [item["status"] for item in response.json()["items"]] == ["updated", "invalid"]
+    assert await pg_session.scalar(select(func.count()).select_from(Product)) == 1
@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import text
+
+from core.config import DbPool
+from core.models.db_helper import DatabaseHelper, Replica, create_engine
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_engines_connect_with_other_drivers(tmp_path):
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'other.db'}", echo=False, pool=DbPool())
+    async with engine.connect() as conn:
+        assert await conn.scalar(text("SELECT 1")) == 1
+    await engine.dispose()
+
+
+async def test_replicas_on_other_databases_report_no_lag(tmp_path):
+    replica = Replica(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", echo=False, pool=DbPool())
+    replica.healthy, replica.lag = False, None
+
+    await replica.check(timeout=2)
+    assert (replica.healthy, replica.lag, replica.error) == (True, 0.0, None)
+    await replica.engine.dispose()
+
+
+async def test_helpers_do_not_share_default_settings(tmp_path):
+    first = DatabaseHelper(f"sqlite+aiosqlite:///{tmp_path / 'first.db'}")
+    second = DatabaseHelper(f"sqlite+aiosqlite:///{tmp_path / 'second.db'}")
+    assert first.replica_config is not second.replica_config
+    await first.dispose()
+    await second.dispose()
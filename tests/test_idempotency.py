@@ -0,0 +1,89 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+
+from api_v1.products import crud
+from core.idempotency import REPLAYED_HEADER, idempotency_store
+from core.models import IdempotencyKey, Product
+
+from .factories import create_products
+
+pytestmark = pytest.mark.anyio
+
+PRODUCT = {"name": "Lamp", "description": "", "price": 100}
+
+
+async def test_replays_the_first_response(pg_client, pg_session):
+    headers = {"Idempotency-Key": "k1"}
+    first = await pg_client.post("/api/v1/products/", json=PRODUCT, headers=headers)
+    assert first.status_code == 201
+    assert REPLAYED_HEADER not in first.headers
+
+    replay = await pg_client.post("/api/v1/products/", json=PRODUCT, headers=headers)
+    assert replay.status_code == 201
+    assert replay.headers[REPLAYED_HEADER] == "true"
+    assert replay.json() == first.json()
+    assert await pg_session.scalar(select(func.count()).select_from(Product)) == 1
+
+    stored = await pg_session.scalar(select(IdempotencyKey))
+    assert (stored.scope, stored.key, stored.status_code) == ("products:create", "k1", 201)
+
+    reused = await pg_client.post("/api/v1/products/", json={**PRODUCT, "price": 200}, headers=headers)
+    assert reused.status_code == 422
+
+
+async def test_failed_attempts_are_not_stored(pg_client, pg_session):
+    headers = {"Idempotency-Key": "k2"}
+    failed = await pg_client.post("/api/v1/orders/", json={"items": [{"product_id": 404}]}, headers=headers)
+    assert failed.status_code == 422
+    assert await pg_session.scalar(select(IdempotencyKey)) is None
+
+    (product_id,) = await create_products(pg_session, 1)
+    order = {"items": [{"product_id": product_id}]}
+    created = await pg_client.post("/api/v1/orders/", json=order, headers=headers)
+    assert created.status_code == 201
+    replay = await pg_client.post("/api/v1/orders/", json=order, headers=headers)
+    assert replay.headers[REPLAYED_HEADER] == "true"
+    assert replay.json()["id"] == created.json()["id"]
+
+
+async def test_expired_keys_run_again_and_are_purged(pg_client, pg_session):
+    headers = {"Idempotency-Key": "k3"}
+    first = await pg_client.post("/api/v1/products/", json=PRODUCT, headers=headers)
+    expire = update(IdempotencyKey).values(created_at=IdempotencyKey.created_at - idempotency_store.ttl - timedelta(minutes=1))
+    await pg_session.execute(expire)
+    await pg_session.commit()
+
+    again = await pg_client.post("/api/v1/products/", json=PRODUCT, headers=headers)
+    assert again.status_code == 201
+    assert REPLAYED_HEADER not in again.headers
+    assert again.json()["id"] != first.json()["id"]
+
+    await pg_session.execute(expire)
+    await pg_session.commit()
+    assert await idempotency_store.purge(pg_session) == 1
+    assert await pg_session.scalar(select(IdempotencyKey)) is None
+
+
+async def test_concurrent_duplicates_wait_for_the_first_response(pg_client, pg_session, monkeypatch):
+    create_product = crud.create_product
+
+    async def slow_create_product(*args, **kwargs):
+        # keep the claim open while the duplicate arrives
+        product = await create_product(*args, **kwargs)
+        await asyncio.sleep(0.2)
+        return product
+
+    monkeypatch.setattr(crud, "create_product", slow_create_product)
+    headers = {"Idempotency-Key": "k4"}
+    first, second = await asyncio.gather(
+        pg_client.post("/api/v1/products/", json=PRODUCT, headers=headers),
+        pg_client.post("/api/v1/products/", json=PRODUCT, headers=headers),
+    )
+
+    assert (first.status_code, second.status_code) == (201, 201)
+    assert first.json() == second.json()
+    assert sorted(REPLAYED_HEADER in response.headers for response in (first, second)) == [False, True]
+    assert await pg_session.scalar(select(func.count()).select_from(Product)) == 1
@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func, select, text
+
+from core.models import Order, OrderProductAssociation
+
+from .factories import create_order, create_products
+
+pytestmark = pytest.mark.anyio
+
+
+async def count_rows(session, table: str) -> int:
+    return await session.scalar(text(f"SELECT count(*) FROM {table}"))
+
+
+async def test_new_partition_takes_over_rows_from_the_default_one(pg_session):
+    (product_id,) = await create_products(pg_session, 1)
+    # a month no partition was created for in time
+    order_id = await create_order(pg_session, datetime(2031, 5, 10), {product_id: 2})
+    await create_order(pg_session, datetime(2031, 6, 10), {product_id: 1})
+    assert await count_rows(pg_session, "orders_default") == 2
+
+    created = await pg_session.scalar(
+        select(func.create_order_partitions(date(2031, 5, 1), date(2031, 5, 31)))
+    )
+    await pg_session.commit()
+
+    assert created == 1
+    assert await count_rows(pg_session, "orders_p2031_05") == 1
+    assert await count_rows(pg_session, "order_product_association_p2031_05") == 1
+    # other months stay where they are
+    assert await count_rows(pg_session, "orders_default") == 1
+    assert await count_rows(pg_session, "order_product_association_default") == 1
+    line_count = await pg_session.scalar(
+        select(OrderProductAssociation.count).join(Order).where(Order.id == order_id)
+    )
+    assert line_count == 2
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from api_v1.orders import crud
+from api_v1.orders.schemas import OrderCreate
+from core.models import ArchivedOrder, Order
+from core.models.db_helper import create_session_factory
+
+from .factories import create_order, create_products
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_create_order(pg_session):
+    first, second = await create_products(pg_session, 2, price=100)
+
+    order = await crud.create_order(
+        pg_session,
+        OrderCreate(items=[{"product_id": first, "count": 2}, {"product_id": second}, {"product_id": first}]),
+    )
+    assert (order.total, order.items_count) == (400, 4)
+    assert [(line.product_id, line.count) for line in order.items] == [(first, 3), (second, 1)]
+    assert await pg_session.scalar(select(Order.created_at).where(Order.id == order.id)) == order.created_at
+
+
+async def list_all(session, limit: int) -> list[int]:
+    order_ids, after = [], None
+    while True:
+        orders, after = await crud.get_orders(session, limit=limit, after=after)
+        order_ids.extend(order.id for order in orders)
+        if after is None:
+            return order_ids
+
+
+async def test_order_pages_merge_hot_and_archived_orders(pg_engine, pg_session):
+    (product_id,) = await create_products(pg_session, 1)
+    start = datetime(2025, 1, 1)
+    order_ids = [await create_order(pg_session, start + timedelta(days=i), {product_id: 1}) for i in range(6)]
+    newest_first = order_ids[::-1]
+
+    # live traffic holds the oldest order: the archive job skips it and
+    # moves newer ones, leaving it behind in the hot table
+    async with create_session_factory(pg_engine)() as traffic:
+        await traffic.execute(select(Order).where(Order.id == order_ids[0]).with_for_update())
+        assert await crud.archive_orders(pg_session, before=start + timedelta(days=4), batch_size=10) == (3, 3)
+        await traffic.rollback()
+    assert list(await pg_session.scalars(select(Order.id).order_by(Order.id))) == [order_ids[0], *order_ids[4:]]
+    assert list(await pg_session.scalars(select(ArchivedOrder.id).order_by(ArchivedOrder.id))) == order_ids[1:4]
+
+    for limit in (1, 2, 3, 10):
+        assert await list_all(pg_session, limit) == newest_first
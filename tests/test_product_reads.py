@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from api_v1.products import crud
+from api_v1.products.cache import product_cache, product_reads
+from api_v1.products.shemas import Product as ProductSchema, ProductUpdatePartial
+from core.models import Base, Product
+from core.models.db_helper import READ_OWN_WRITES, create_session_factory
+
+from .conftest import SQLITE_TABLES
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def replica_session(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all, tables=SQLITE_TABLES)
+    async with create_session_factory(engine, replica=True)() as session:
+        yield session
+    await engine.dispose()
+
+
+async def add_product(session, version: int) -> None:
+    await session.execute(insert(Product).values(id=1, name=f"v{version}", description="", price=100, version=version))
+    await session.commit()
+
+
+async def test_replica_reads_do_not_fill_the_cache(sqlite_session, replica_session):
+    await add_product(sqlite_session, version=2)
+    # the replica has not replayed the update yet
+    await add_product(replica_session, version=1)
+
+    product = await crud.get_cached_product(replica_session, 1)
+    assert product.version == 1
+    assert 1 not in product_cache
+
+
+async def test_primary_reads_fill_the_cache(sqlite_session):
+    await add_product(sqlite_session, version=2)
+
+    product = await crud.get_cached_product(sqlite_session, 1)
+    assert product.version == 2
+    assert product_cache.get(1).version == 2
+
+
+async def test_read_own_writes_skips_the_cache(sqlite_session):
+    await add_product(sqlite_session, version=2)
+    product_cache.set(1, (await crud.get_cached_product(sqlite_session, 1)).model_copy(update={"version": 1}))
+
+    assert (await crud.get_cached_product(sqlite_session, 1)).version == 1
+    sqlite_session.info[READ_OWN_WRITES] = True
+    assert (await crud.get_cached_product(sqlite_session, 1)).version == 2
+    assert await crud.get_product_version(sqlite_session, 1) == 2
+    assert (await crud.get_product_row(sqlite_session, 1, ["name"]))["version"] == 2
+
+
+async def test_reads_coalesce_per_database(sqlite_session, replica_session):
+    await add_product(sqlite_session, version=2)
+    await add_product(replica_session, version=1)
+    executions = product_reads.executions
+
+    primary_pages, replica_pages = await asyncio.gather(
+        crud.get_products(sqlite_session, limit=10),
+        crud.get_products(replica_session, limit=10),
+    )
+    assert product_reads.executions - executions == 2
+    assert primary_pages[0][0].version == 2
+    assert replica_pages[0][0].version == 1
+
+
+async def test_coalesced_pages_do_not_share_orm_instances(sqlite_engine, sqlite_session):
+    await add_product(sqlite_session, version=2)
+    executions = product_reads.executions
+
+    async with create_session_factory(sqlite_engine)() as other_session:
+        (leader_page, _), (follower_page, _) = await asyncio.gather(
+            crud.get_products(sqlite_session, limit=10),
+            crud.get_products(other_session, limit=10),
+        )
+        assert product_reads.executions - executions == 1
+        assert follower_page == leader_page
+        assert all(isinstance(product, ProductSchema) for product in follower_page)
+        assert not sqlite_session.identity_map and not other_session.identity_map
+
+
+async def test_older_reads_do_not_replace_newer_cached_versions(sqlite_session):
+    await add_product(sqlite_session, version=2)
+    product = await crud.get_cached_product(sqlite_session, 1)
+
+    await crud.update_product(sqlite_session, 1, ProductUpdatePartial(name="v3"), partial=True)
+    assert product_cache.get(1).name == "v3"
+    # a read that loaded version 2 before the update finishes after it
+    crud.cache_product(product)
+    assert product_cache.get(1).version == 3
+
+
+async def test_older_reads_do_not_bring_back_deleted_products(sqlite_session):
+    await add_product(sqlite_session, version=2)
+    product = await crud.get_cached_product(sqlite_session, 1)
+
+    assert await crud.delete_product(sqlite_session, 1)
+    # a read that loaded the product before the delete finishes after it
+    crud.cache_product(product)
+    assert await crud.get_cached_product(sqlite_session, 1) is None
+    assert await crud.get_product_version(sqlite_session, 1) is None
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import insert, update
+
+from api_v1.products import crud
+from core.models import Product
+
+pytestmark = pytest.mark.anyio
+
+
+async def search_all(session, q: str, limit: int) -> list[str]:
+    names, after = [], None
+    while True:
+        hits, after = await crud.search_products(session, q=q, limit=limit, after=after)
+        names.extend(product.name for product, _ in hits)
+        if after is None:
+            return names
+
+
+async def test_search_ranks_and_pages(sqlite_session):
+    await sqlite_session.execute(
+        insert(Product),
+        [
+            {"name": "Blue mug", "description": "ceramic", "price": 1},
+            {"name": "Red mug", "description": "ceramic", "price": 1},
+            {"name": "Red kettle", "description": "red enamel, red lid", "price": 1},
+            {"name": "Red plate", "description": "ceramic", "price": 1},
+            {"name": "Teapot", "description": "with a red lid", "price": 1},
+        ],
+    )
+    await sqlite_session.commit()
+
+    hits, after = await crud.search_products(sqlite_session, q="red", limit=10)
+    assert after is None
+    ranks = [rank for _, rank in hits]
+    assert ranks == sorted(ranks, reverse=True)
+    assert hits[0][0].name == "Red kettle"
+    assert {product.name for product, _ in hits} == {"Red mug", "Red kettle", "Red plate", "Teapot"}
+
+    # keyset pages of one and two hits, including across equal ranks
+    names = [product.name for product, _ in hits]
+    assert await search_all(sqlite_session, "red", limit=1) == names
+    assert await search_all(sqlite_session, "red", limit=2) == names
+
+
+async def test_search_index_follows_writes(sqlite_session):
+    await sqlite_session.execute(insert(Product).values(id=1, name="Red mug", description="", price=1))
+    await sqlite_session.commit()
+    await sqlite_session.execute(update(Product).where(Product.id == 1).values(name="Green mug"))
+    await sqlite_session.commit()
+
+    assert await search_all(sqlite_session, "red", limit=10) == []
+    assert await search_all(sqlite_session, "green mug", limit=10) == ["Green mug"]
@@ -0,0 +1,178 @@
+from datetime import datetime
+from time import monotonic
+
+import pytest
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import selectinload
+
+from api_v1.orders import crud as orders_crud
+from api_v1.orders.schemas import OrderCreate
+from core.models import Post, Product, User
+from core.models.db_helper import create_session_factory
+from core import query_cache as query_cache_module
+from core.query_cache import LocalStore, SharedBackend, query_cache
+
+from .factories import create_order, create_products
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def statements(sqlite_engine) -> list[str]:
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(sqlite_engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(sqlite_engine.sync_engine, "before_cursor_execute", record)
+
+
+def cached(stmt):
+    return stmt.execution_options(query_cache=True)
+
+
+async def test_hit_after_miss(sqlite_session, statements):
+    await sqlite_session.execute(insert(Product).values(id=1, name="a", description="", price=100))
+    await sqlite_session.commit()
+    stmt = cached(select(Product.name).where(Product.id == 1))
+    misses, hits = query_cache.misses, query_cache.hits
+
+    statements.clear()
+    assert await sqlite_session.scalar(stmt) == "a"
+    assert await sqlite_session.scalar(stmt) == "a"
+    assert len(statements) == 1
+    assert (query_cache.misses - misses, query_cache.hits - hits) == (1, 1)
+
+    # other parameters, other entry
+    assert await sqlite_session.scalar(cached(select(Product.name).where(Product.id == 2))) is None
+    assert query_cache.misses - misses == 2
+
+
+async def test_writes_invalidate(sqlite_session, statements):
+    await sqlite_session.execute(insert(Product).values(id=1, name="a", description="", price=100))
+    await sqlite_session.commit()
+    stmt = cached(select(Product.name).where(Product.id == 1))
+    await sqlite_session.scalar(stmt)
+
+    # an update statement
+    await sqlite_session.execute(update(Product).where(Product.id == 1).values(name="b"))
+    await sqlite_session.commit()
+    statements.clear()
+    assert await sqlite_session.scalar(stmt) == "b"
+    assert len(statements) == 1
+
+    # a flush of a changed object
+    product = await sqlite_session.get(Product, 1)
+    product.name = "c"
+    await sqlite_session.commit()
+    assert await sqlite_session.scalar(stmt) == "c"
+
+
+async def test_flushes_only_tag_changed_association_tables(sqlite_session):
+    await sqlite_session.execute(insert(Product).values(id=1, name="a", description="", price=100))
+    await sqlite_session.commit()
+    tags = ["products", "order_product_association"]
+    before = query_cache.backend.generations(tags)
+
+    # Product.orders goes through order_product_association; a rename does not
+    product = await sqlite_session.get(Product, 1)
+    product.name = "b"
+    await sqlite_session.commit()
+    products, lines = query_cache.backend.generations(tags)
+    assert products > before[0]
+    assert lines == before[1]
+
+
+async def test_selectin_loads_are_tracked(sqlite_session, statements):
+    sqlite_session.add(User(id=1, username="u", posts=[Post(title="first")]))
+    await sqlite_session.commit()
+    stmt = cached(select(User).options(selectinload(User.posts)).where(User.id == 1))
+
+    async def titles() -> list[str]:
+        user = await sqlite_session.scalar(stmt)
+        titles = [post.title for post in user.posts]
+        sqlite_session.expunge_all()
+        return titles
+
+    # the first read finds out the selectin load also reads posts
+    assert await titles() == ["first"]
+    assert await titles() == ["first"]
+    statements.clear()
+    assert await titles() == ["first"]
+    assert statements == []
+
+    # a new post invalidates the cached user with its posts
+    await sqlite_session.execute(insert(Post).values(user_id=1, title="second"))
+    await sqlite_session.commit()
+    assert sorted(await titles()) == ["first", "second"]
+
+
+async def test_replica_sessions_do_not_store(sqlite_engine, statements):
+    async with create_session_factory(sqlite_engine)() as session:
+        await session.execute(insert(Product).values(id=1, name="a", description="", price=100))
+        await session.commit()
+    stmt = cached(select(Product.name).where(Product.id == 1))
+
+    async with create_session_factory(sqlite_engine, replica=True)() as replica:
+        statements.clear()
+        await replica.scalar(stmt)
+        await replica.scalar(stmt)
+        assert len(statements) == 2
+
+    async with create_session_factory(sqlite_engine)() as session:
+        await session.scalar(stmt)
+        # replicas may read what the primary stored
+        async with create_session_factory(sqlite_engine, replica=True)() as replica:
+            statements.clear()
+            assert await replica.scalar(stmt) == "a"
+            assert statements == []
+
+
+async def test_selects_over_data_modifying_ctes_invalidate(pg_session):
+    (product_id,) = await create_products(pg_session, 1)
+    await create_order(pg_session, datetime(2026, 1, 1), {product_id: 1})
+    tags = ["orders", "order_product_association", "orders_archive", "order_product_association_archive"]
+
+    before = query_cache.backend.generations(tags)
+    await orders_crud.create_order(pg_session, OrderCreate(items=[{"product_id": product_id}]))
+    created = query_cache.backend.generations(tags)
+    assert created[0] > before[0] and created[1] > before[1]
+
+    await orders_crud.archive_orders(pg_session, before=datetime(2026, 2, 1), batch_size=10)
+    archived = query_cache.backend.generations(tags)
+    assert all(after > previous for after, previous in zip(archived, created))
+
+
+async def test_shared_backend(sqlite_session, statements, monkeypatch):
+    store = LocalStore()
+    monkeypatch.setattr(query_cache, "backend", SharedBackend(store))
+    await sqlite_session.execute(insert(Product).values(id=1, name="a", description="", price=100))
+    await sqlite_session.commit()
+    stmt = cached(select(Product.name).where(Product.id == 1))
+
+    # stored pickled in the store, read back through await_only
+    assert await sqlite_session.scalar(stmt) == "a"
+    statements.clear()
+    assert await sqlite_session.scalar(stmt) == "a"
+    assert statements == []
+
+    # this worker's write bumps the shared generation
+    await sqlite_session.execute(update(Product).where(Product.id == 1).values(name="b"))
+    await sqlite_session.commit()
+    assert await sqlite_session.scalar(stmt) == "b"
+    assert len(statements) == 2
+
+    # so does another worker's
+    await store.incr("query-cache:gen:products")
+    statements.clear()
+    assert await sqlite_session.scalar(stmt) == "b"
+    assert len(statements) == 1
+
+    # entries expire with the TTL
+    now = monotonic()
+    monkeypatch.setattr(query_cache_module, "monotonic", lambda: now + query_cache.ttl + 1)
+    statements.clear()
+    assert await sqlite_session.scalar(stmt) == "b"
+    assert len(statements) == 1
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from api_v1.products.related import refresh_related_products
+from core.models import ProductPairCount, RelatedProduct
+
+from .factories import create_order, create_products
+
+pytest.importorskip("scipy")
+pytestmark = pytest.mark.anyio
+
+DAY = datetime(2026, 10, 1)
+
+
+async def refresh_all(session, until: datetime) -> None:
+    while await refresh_related_products(
+            session=session,
+            until=until,
+            top_k=2,
+            slice_length=timedelta(hours=6),
+    ) is not None:
+        pass
+
+
+async def pair_counts(session) -> dict[tuple[int, int], int]:
+    result = await session.execute(
+        select(ProductPairCount.product_id, ProductPairCount.related_id, ProductPairCount.count)
+    )
+    return {(product_id, related_id): count for product_id, related_id, count in result}
+
+
+async def test_refresh_upserts_pair_counts_and_ranks(pg_session):
+    a, b, c = await create_products(pg_session, 3)
+    await create_order(pg_session, DAY, {a: 1, b: 1})
+    await create_order(pg_session, DAY + timedelta(hours=1), {a: 2, b: 1, c: 1})
+
+    await refresh_all(pg_session, until=DAY + timedelta(days=1))
+    assert await pair_counts(pg_session) == {
+        (a, b): 2, (b, a): 2,
+        (a, c): 1, (c, a): 1,
+        (b, c): 1, (c, b): 1,
+    }
+
+    # a later slice adds onto the existing pairs (ON CONFLICT DO UPDATE)
+    await create_order(pg_session, DAY + timedelta(days=1), {a: 1, c: 1})
+    await create_order(pg_session, DAY + timedelta(days=1, hours=1), {a: 1, c: 1})
+    await refresh_all(pg_session, until=DAY + timedelta(days=2))
+    counts = await pair_counts(pg_session)
+    assert counts[a, c] == counts[c, a] == 3
+    assert counts[a, b] == 2
+
+    result = await pg_session.execute(
+        select(RelatedProduct.rank, RelatedProduct.related_id, RelatedProduct.count)
+        .where(RelatedProduct.product_id == a)
+        .order_by(RelatedProduct.rank)
+    )
+    assert result.all() == [(1, c, 3), (2, b, 2)]
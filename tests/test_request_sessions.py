@@ -0,0 +1,63 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+
+from core.models import db_helper
+from core.models.db_helper import create_session_factory
+
+from .factories import create_products
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def tracked_client(pg_engine, monkeypatch):
+    # yields the client and, per response, the connections still checked
+    # out when the response started
+    from main import app
+
+    monkeypatch.setattr(db_helper, "session_factory", create_session_factory(pg_engine))
+    checked_out = 0
+    at_response_start = []
+
+    def on_checkout(dbapi_connection, record, proxy):
+        nonlocal checked_out
+        checked_out += 1
+
+    def on_checkin(dbapi_connection, record):
+        nonlocal checked_out
+        checked_out -= 1
+
+    async def tracked_app(scope, receive, send):
+        async def tracked_send(message):
+            if message["type"] == "http.response.start":
+                at_response_start.append(checked_out)
+            await send(message)
+
+        await app(scope, receive, tracked_send)
+
+    event.listen(pg_engine.sync_engine.pool, "checkout", on_checkout)
+    event.listen(pg_engine.sync_engine.pool, "checkin", on_checkin)
+    async with AsyncClient(transport=ASGITransport(app=tracked_app), base_url="http://test") as client:
+        yield client, at_response_start
+    event.remove(pg_engine.sync_engine.pool, "checkout", on_checkout)
+    event.remove(pg_engine.sync_engine.pool, "checkin", on_checkin)
+
+
+async def test_order_routes_release_the_session_when_the_response_starts(tracked_client, pg_session):
+    client, at_response_start = tracked_client
+    product_id, other_id = await create_products(pg_session, 2)
+
+    created = await client.post("/api/v1/orders/", json={"items": [{"product_id": product_id}]})
+    order_id = created.json()["id"]
+    responses = [
+        created,
+        await client.get("/api/v1/orders/"),
+        await client.get(f"/api/v1/orders/{order_id}/"),
+        await client.get("/api/v1/orders/404/"),
+        await client.post(f"/api/v1/orders/{order_id}/lines/", json={"product_id": other_id}),
+        await client.delete(f"/api/v1/orders/{order_id}/lines/{other_id}/"),
+    ]
+
+    assert [response.status_code for response in responses] == [201, 200, 200, 404, 200, 200]
+    assert at_response_start == [0] * len(responses)
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, select
+
+from api_v1.analytics.crud import SALES_WATERMARK, get_watermark, refresh_sales_rollups
+from api_v1.orders import crud as orders_crud
+from api_v1.orders.schemas import OrderCreate, OrderLineCreate
+from core.models import DailySales, HourlySales
+
+from .factories import create_order, create_products
+
+pytestmark = pytest.mark.anyio
+
+
+async def units(session, rollup) -> dict[datetime, int]:
+    result = await session.execute(select(rollup.bucket, rollup.units))
+    return dict(result.tuples().all())
+
+
+async def test_cutoff_and_created_at_share_the_database_clock(pg_engine, pg_session):
+    # a server whose local time is ahead of UTC
+    @event.listens_for(pg_engine.sync_engine, "connect")
+    def set_time_zone(dbapi_connection, connection_record):
+        dbapi_connection.run_async(lambda connection: connection.execute("SET TIME ZONE 'Asia/Tokyo'"))
+
+    (product_id,) = await create_products(pg_session, 1)
+    order = await orders_crud.create_order(pg_session, OrderCreate(items=[{"product_id": product_id}]))
+    assert abs(order.created_at - datetime.utcnow()) < timedelta(minutes=1)
+
+    _, until = await refresh_sales_rollups(pg_session, lag=timedelta(0))
+    assert order.created_at < until == await get_watermark(pg_session, SALES_WATERMARK)
+    assert sum((await units(pg_session, HourlySales)).values()) == 1
+
+
+async def test_line_edits_reach_buckets_already_rolled_up(pg_session):
+    product_id, other_id = await create_products(pg_session, 2, price=100)
+    created_at = datetime(2026, 1, 1, 10, 30)
+    order_id = await create_order(pg_session, created_at, {product_id: 1})
+    await refresh_sales_rollups(pg_session, lag=timedelta(0))
+    hour, day = datetime(2026, 1, 1, 10), datetime(2026, 1, 1)
+    assert await units(pg_session, HourlySales) == {hour: 1}
+
+    await orders_crud.add_order_line(pg_session, order_id, OrderLineCreate(product_id=product_id, count=2))
+    await orders_crud.add_order_line(pg_session, order_id, OrderLineCreate(product_id=other_id))
+    await orders_crud.remove_order_line(pg_session, order_id, product_id, count=1)
+
+    expected = {(product_id, 2, 200), (other_id, 1, 100)}
+    for rollup, bucket in ((HourlySales, hour), (DailySales, day)):
+        result = await pg_session.execute(
+            select(rollup.product_id, rollup.units, rollup.revenue).where(rollup.bucket == bucket)
+        )
+        assert set(result.tuples().all()) == expected
+
+    # the next refresh leaves the edited buckets alone
+    await refresh_sales_rollups(pg_session, lag=timedelta(0))
+    result = await pg_session.execute(select(HourlySales.product_id, HourlySales.units, HourlySales.revenue))
+    assert set(result.tuples().all()) == expected